@@ -0,0 +1,301 @@
+import argparse
+import time
+
+import numpy as np
+
+from cache import ComponentCache
+from minesweeper import MinesweeperAI
+
+
+def neighbor_sum(layer):
+    """
+    Returns, for every cell of a stack of boards, how many of the
+    cells within one row and column of it are set in `layer`,
+    not including the cell itself.
+    """
+    games, height, width = layer.shape
+    padded = np.zeros((games, height + 2, width + 2), dtype=np.uint8)
+    padded[:, 1:-1, 1:-1] = layer
+    total = np.zeros((games, height, width), dtype=np.uint8)
+    for di in (0, 1, 2):
+        for dj in (0, 1, 2):
+            if (di, dj) != (1, 1):
+                total += padded[:, di:di + height, dj:dj + width]
+    return total
+
+
+def shift(layer, di, dj):
+    """
+    Returns a stack of boards where every cell holds the value of the
+    cell `di` rows down and `dj` columns right of it in `layer`, or
+    zero where that cell is off the board.
+    """
+    games, height, width = layer.shape
+    shifted = np.zeros_like(layer)
+    if abs(di) >= height or abs(dj) >= width:
+        return shifted
+    shifted[:, max(-di, 0):height - max(di, 0),
+            max(-dj, 0):width - max(dj, 0)] = \
+        layer[:, max(di, 0):height - max(-di, 0),
+              max(dj, 0):width - max(-dj, 0)]
+    return shifted
+
+
+# Offsets of the cells within one row and column of a cell, and of
+# the numbers close enough to share unknown neighbours with it
+WINDOW = {(di, dj) for di in (-1, 0, 1) for dj in (-1, 0, 1)}
+PAIRS = [(di, dj) for di in range(-2, 3) for dj in range(-2, 3)
+         if (di, dj) != (0, 0)]
+
+
+def pair_rule(revealed, unknown, remaining):
+    """
+    Compares every number A with every number B that shares unknown
+    neighbours with it. If B needs as many more mines than A as it has
+    unknown neighbours that A lacks, those are all mines and the
+    unknown neighbours of A that B lacks are all safe.
+    Returns masks of the cells found safe and found to be mines.
+    """
+    unknown = unknown.astype(np.int16)
+    around = neighbor_sum(unknown).astype(np.int16)
+    safe = np.zeros(revealed.shape, dtype=bool)
+    mines = np.zeros(revealed.shape, dtype=bool)
+    for di, dj in PAIRS:
+        other = {(di + r, dj + c) for r, c in WINDOW}
+        shared = sum(shift(unknown, r, c) for r, c in WINDOW & other)
+        only_a = around - shared
+        only_b = shift(around, di, dj) - shared
+        found = revealed & shift(revealed, di, dj) & (only_a + only_b > 0) & (
+            shift(remaining, di, dj) - remaining == only_b
+        )
+        if not found.any():
+            continue
+        for r, c in WINDOW - other:
+            safe |= shift(found, -r, -c)
+        for r, c in other - WINDOW:
+            mines |= shift(found, -r, -c)
+    unknown = unknown.astype(bool)
+    return safe & unknown, mines & unknown
+
+
+class BatchMinesweeper():
+    """
+    Many Minesweeper games of the same size, stored as stacked
+    arrays and played in lockstep. Every step reveals all the cells
+    the array rules prove safe in each game, and games where they
+    find nothing guess the cell least likely to be a mine. With
+    `exact`, those games first ask a MinesweeperAI, which solves the
+    frontier exactly, and only guess if it proves nothing either.
+    """
+
+    def __init__(self, games, height=8, width=8, mines=8, seed=None,
+                 exact=False):
+
+        # Set initial width, height, and number of mines
+        self.games = games
+        self.height = height
+        self.width = width
+        self.mine_count = mines
+        self.exact = exact
+        self.rng = np.random.default_rng(seed)
+
+        # Place mines by taking the first cells of a random
+        # permutation of each board
+        order = np.argsort(
+            self.rng.random((games, height * width)), axis=1
+        )[:, :mines]
+        self.mines = np.zeros((games, height * width), dtype=bool)
+        np.put_along_axis(self.mines, order, True, axis=1)
+        self.mines = self.mines.reshape(games, height, width)
+        self.counts = neighbor_sum(self.mines)
+
+        # Player state of every game
+        self.revealed = np.zeros((games, height, width), dtype=bool)
+        self.flags = np.zeros((games, height, width), dtype=bool)
+        self.lost = np.zeros(games, dtype=bool)
+        self.won = np.zeros(games, dtype=bool)
+        self.stuck = np.zeros(games, dtype=bool)
+        self.moves = np.zeros(games, dtype=np.int64)
+
+        # Number of steps the array rules found nothing in, and the
+        # frontier solutions of the AIs asked in exact mode
+        self.fallbacks = 0
+        self.guesses = 0
+        self.cache = ComponentCache()
+
+    def done(self):
+        """
+        Returns a mask of games that are over.
+        """
+        return self.lost | self.won | self.stuck
+
+    def step(self):
+        """
+        Moves every game that is not over: reveals every cell proven
+        safe, or flags the mines found, or else guesses.
+        Returns the number of games that made progress.
+        """
+        active = np.flatnonzero(~self.done())
+        if len(active) == 0:
+            return 0
+
+        revealed = self.revealed[active]
+        flags = self.flags[active]
+        counts = self.counts[active]
+        before = flags.copy()
+
+        # Flag every unknown neighbour of a number that needs them all
+        unknown = ~revealed & ~flags
+        flagged = neighbor_sum(flags)
+        full = revealed & (counts > flagged) & (
+            counts - flagged == neighbor_sum(unknown)
+        )
+        flags |= (neighbor_sum(full) > 0) & unknown
+
+        # Any unknown neighbour of a satisfied number is safe
+        unknown = ~revealed & ~flags
+        remaining = counts.astype(np.int16) - neighbor_sum(flags)
+        safe = (neighbor_sum(revealed & (remaining == 0)) > 0) & unknown
+
+        # Pairs of numbers settle most of what is left
+        pair_safe, pair_mines = pair_rule(revealed, unknown, remaining)
+        safe |= pair_safe
+        flags |= pair_mines & ~safe
+        self.flags[active] = flags
+
+        # Games with nothing new ask the AI in exact mode, then guess
+        flagging = (flags != before).any(axis=(1, 2))
+        idle = np.flatnonzero(~safe.any(axis=(1, 2)) & ~flagging)
+        self.fallbacks += len(idle)
+        if self.exact:
+            for n in idle:
+                for i, j in self.ai_moves(active[n]):
+                    safe[n, i, j] = True
+            idle = idle[~safe[idle].any(axis=(1, 2))]
+        if len(idle):
+            self.guesses += len(idle)
+            flags = self.flags[active[idle]]
+            unknown = ~revealed[idle] & ~flags
+            cells = self.guess(
+                revealed[idle], unknown, remaining[idle], flags
+            )
+            self.stuck[active[idle[cells < 0]]] = True
+            cells[cells < 0] = 0
+            safe[idle, cells // self.width, cells % self.width] = \
+                unknown.reshape(len(idle), -1)[np.arange(len(idle)), cells]
+
+        moving = safe.any(axis=(1, 2))
+        self.reveal(active[moving], safe[moving])
+        return int((moving | flagging).sum())
+
+    def guess(self, revealed, unknown, remaining, flags):
+        """
+        Returns, for each game, the unknown cell least likely to be a
+        mine, or -1 if there is none. Next to numbers, a cell is
+        taken to be as likely as the worst of its numbers'
+        remaining mines per unknown neighbour; elsewhere, as likely
+        as the density of the mines left.
+        """
+        around = neighbor_sum(unknown)
+        ratio = np.where(
+            revealed & (around > 0), remaining / np.maximum(around, 1), 0.0
+        )
+        risk = np.zeros(ratio.shape)
+        for di, dj in WINDOW:
+            risk = np.maximum(risk, shift(ratio, di, dj))
+        frontier = neighbor_sum(revealed & (around > 0)) > 0
+        left = unknown.sum(axis=(1, 2))
+        density = (self.mine_count - flags.sum(axis=(1, 2))) \
+            / np.maximum(left, 1)
+        risk = np.where(frontier, risk, density[:, None, None])
+
+        # Ties are broken at random
+        risk = risk + self.rng.random(risk.shape) * 1e-6
+        risk[~unknown] = np.inf
+        cells = risk.reshape(len(risk), -1).argmin(axis=1)
+        cells[left == 0] = -1
+        return cells
+
+    def ai_moves(self, game):
+        """
+        Builds a MinesweeperAI from the game's board with
+        MinesweeperAI.from_snapshot, flags the mines it knows, and
+        returns every cell it knows to be safe.
+        """
+        revealed = np.argwhere(self.revealed[game])
+        counts = self.counts[game][self.revealed[game]]
+        ai = MinesweeperAI.from_snapshot(
+            zip(map(tuple, revealed.tolist()), counts.tolist()),
+            flags=map(tuple, np.argwhere(self.flags[game]).tolist()),
+            height=self.height, width=self.width, cache=self.cache
+        )
+
+        for i, j in ai.mines:
+            self.flags[game, i, j] = True
+        return [cell for cell in ai.safes if not self.revealed[game][cell]]
+
+    def reveal(self, games, cells):
+        """
+        Reveals the cells set in `cells` in each of the given games,
+        opening up every cell around revealed zeros, and updates win
+        and loss state.
+        """
+        if len(games) == 0:
+            return
+        self.moves[games] += cells.sum(axis=(1, 2))
+        hit = (cells & self.mines[games]).any(axis=(1, 2))
+        self.lost[games[hit]] = True
+        games, cells = games[~hit], cells[~hit]
+
+        # Open up cells around zeros until nothing changes
+        revealed = self.revealed[games] | cells
+        zero = self.counts[games] == 0
+        while True:
+            opened = (neighbor_sum(revealed & zero) > 0) & ~revealed
+            if not opened.any():
+                break
+            revealed |= opened
+        self.revealed[games] = revealed
+
+        safe_cells = self.height * self.width - self.mine_count
+        self.won[games] = revealed.sum(axis=(1, 2)) == safe_cells
+
+    def run(self):
+        """
+        Plays every game to the end.
+        """
+        while self.step():
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play many Minesweeper games in lockstep."
+    )
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--height", type=int, default=8)
+    parser.add_argument("--width", type=int, default=8)
+    parser.add_argument("--mines", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--exact", action="store_true",
+                        help="ask an AI to solve the frontier before guessing")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    batch = BatchMinesweeper(
+        args.games, args.height, args.width, args.mines, seed=args.seed,
+        exact=args.exact
+    )
+    batch.run()
+    elapsed = time.perf_counter() - start
+
+    print(f"Games: {args.games}")
+    print(f"Won: {int(batch.won.sum())} ({batch.won.mean():.1%})")
+    print(f"Lost: {int(batch.lost.sum())}")
+    print(f"Stuck: {int(batch.stuck.sum())}")
+    print(f"Fallbacks: {batch.fallbacks} ({batch.guesses} guesses)")
+    print(f"Time: {elapsed:.2f}s ({args.games / elapsed:.0f} games/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+import argparse
+import mmap
+import random
+import struct
+import time
+
+from minesweeper import Minesweeper
+
+# File header: magic, height, width, number of mines, seed
+MAGIC = b"MSWMAP1\0"
+HEADER = struct.Struct("<8sIIQQ")
+HEADER_SIZE = 64
+
+# Bits of precision used for the mine density
+PRECISION = 16
+
+# Turns the characters "0" and "1" into the bytes 0 and 1
+BITS_TO_BYTES = bytes.maketrans(b"01", b"\x00\x01")
+
+
+def random_row(rng, width, density):
+    """
+    Returns a `width`-bit int with each bit set with probability
+    `density`, built from one random word per bit of precision.
+    """
+    level = round(density * (1 << PRECISION))
+    if level >= 1 << PRECISION:
+        return (1 << width) - 1
+    row = 0
+    for k in range(PRECISION):
+        bits = rng.getrandbits(width)
+        if level >> k & 1:
+            row |= bits
+        else:
+            row &= bits
+    return row
+
+
+def lanes(row, width):
+    """
+    Spreads the bits of a row out to one byte per cell, returned as
+    an int whose byte j is cell j, so rows can be added lane-wise.
+    """
+    if width == 0:
+        return 0
+    return int.from_bytes(
+        format(row, f"0{width}b")[::-1].encode().translate(BITS_TO_BYTES),
+        "little"
+    )
+
+
+def neighbor_counts(previous, current, following, width):
+    """
+    Returns the number of mines next to each cell of a row, one byte
+    per cell, given the lanes() of the row and of the rows on either
+    side of it.
+    """
+
+    # Sum the three rows, then each cell and its two sides,
+    # less the cell itself; no lane ever exceeds 8
+    column = previous + current + following
+    counts = (column + (column << 8) + (column >> 8)) & ((1 << 8 * width) - 1)
+    return (counts - current).to_bytes(width, "little")
+
+
+def build_mapped_board(path, height, width, density=0.16, seed=0, band=1024):
+    """
+    Writes a board of the given size to `path`, one band of rows at
+    a time: a bit-packed mine layer followed by a 4-bit packed layer
+    of neighbour counts. Returns the board, opened from the file.
+    """
+    mine_stride = (width + 7) // 8
+    count_stride = (width + 1) // 2
+    count_base = HEADER_SIZE + height * mine_stride
+
+    with open(path, "w+b") as f:
+        f.truncate(count_base + height * count_stride)
+        mapping = mmap.mmap(f.fileno(), 0)
+
+        def row(i):
+            rng = random.Random(f"{seed}:{i}")
+            return random_row(rng, width, density)
+
+        mines = 0
+        band_start = 0
+        mine_band = bytearray()
+        count_band = bytearray()
+        previous = 0
+        bits = row(0) if height else 0
+        current = lanes(bits, width)
+        for i in range(height):
+            mines += bin(bits).count("1")
+            mine_band += bits.to_bytes(mine_stride, "little")
+            if i + 1 < height:
+                bits = row(i + 1)
+                following = lanes(bits, width)
+            else:
+                following = 0
+
+            counts = neighbor_counts(previous, current, following, width)
+            even = int.from_bytes(counts[0::2], "little")
+            odd = int.from_bytes(counts[1::2], "little")
+            count_band += (even * 16 + odd).to_bytes(count_stride, "little")
+            previous, current = current, following
+
+            # Write out each full band of rows
+            if (i + 1) % band == 0 or i + 1 == height:
+                offset = HEADER_SIZE + band_start * mine_stride
+                mapping[offset:offset + len(mine_band)] = mine_band
+                offset = count_base + band_start * count_stride
+                mapping[offset:offset + len(count_band)] = count_band
+                band_start = i + 1
+                mine_band = bytearray()
+                count_band = bytearray()
+
+        mapping[:HEADER.size] = HEADER.pack(MAGIC, height, width, mines, seed)
+        mapping.flush()
+        mapping.close()
+
+    return MappedMinesweeper(path)
+
+
+class MineLayer():
+    """
+    Read-only set-like view of the mines of a MappedMinesweeper.
+    """
+
+    def __init__(self, board):
+        self.board = board
+
+    def __contains__(self, cell):
+        return self.board.is_mine(cell)
+
+    def __len__(self):
+        return self.board.mine_count
+
+    def __iter__(self):
+        for i in range(self.board.height):
+            for j in range(self.board.width):
+                if self.board.is_mine((i, j)):
+                    yield (i, j)
+
+
+class MappedMinesweeper(Minesweeper):
+    """
+    Minesweeper game read straight from a memory-mapped board file
+    written by build_mapped_board, so boards far too large for
+    nested lists open instantly and use no memory of their own.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, height, width, mines, seed = HEADER.unpack_from(self.mapping)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a mapped Minesweeper board")
+
+        # Set width, height, and number of mines from the header
+        self.height = height
+        self.width = width
+        self.mine_count = mines
+        self.seed = seed
+        self.mines = MineLayer(self)
+
+        self.mine_stride = (width + 7) // 8
+        self.count_stride = (width + 1) // 2
+        self.count_base = HEADER_SIZE + height * self.mine_stride
+
+        # At first, player has found no mines
+        self.reset()
+
+    def print(self):
+        """
+        Prints a text-based representation
+        of where mines are located.
+        """
+        for i in range(self.height):
+            print("--" * self.width + "-")
+            print("".join(
+                "|X" if self.is_mine((i, j)) else "| "
+                for j in range(self.width)
+            ) + "|")
+        print("--" * self.width + "-")
+
+    def is_mine(self, cell):
+        i, j = cell
+        byte = self.mapping[HEADER_SIZE + i * self.mine_stride + j // 8]
+        return bool(byte >> (j % 8) & 1)
+
+    def nearby_mines(self, cell):
+        """
+        Returns the number of mines that are
+        within one row and column of a given cell,
+        not including the cell itself.
+        """
+        i, j = cell
+        byte = self.mapping[self.count_base + i * self.count_stride + j // 2]
+        if j % 2 == 0:
+            return byte >> 4
+        return byte & 15
+
+    def close(self):
+        """
+        Unmaps the board file.
+        """
+        self.mapping.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build a memory-mapped Minesweeper board file."
+    )
+    parser.add_argument("path")
+    parser.add_argument("--height", type=int, default=50000)
+    parser.add_argument("--width", type=int, default=50000)
+    parser.add_argument("--density", type=float, default=0.16)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    board = build_mapped_board(
+        args.path, args.height, args.width, args.density, args.seed
+    )
+    print(f"Built {board.height}x{board.width} board with "
+          f"{board.mine_count} mines in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import argparse
+import random
+import struct
+import time
+
+from minesweeper import Minesweeper
+
+# Binary files: a magic string, then one record per board, each a
+# header of height, width and number of mines followed by one
+# bit-packed row of mines after another
+MAGIC = b"MSWBRD1\0"
+RECORD = struct.Struct("<III")
+
+# Text files: "height width" on one line, then a row of cells per
+# line, with boards separated by blank lines
+MINE = "*"
+EMPTY = "."
+
+
+def pack(game):
+    """
+    Returns the mines of a game as bit-packed rows.
+    """
+    stride = (game.width + 7) // 8
+    rows = [0] * game.height
+    for i, j in game.mines:
+        rows[i] |= 1 << j
+    return b"".join(row.to_bytes(stride, "little") for row in rows)
+
+
+def unpack(height, width, data):
+    """
+    Returns the mine cells of bit-packed rows.
+    """
+    stride = (width + 7) // 8
+    cells = []
+    for i in range(height):
+        row = int.from_bytes(data[i * stride:(i + 1) * stride], "little")
+        while row:
+            low = row & -row
+            cells.append((i, low.bit_length() - 1))
+            row ^= low
+    return cells
+
+
+class BinaryWriter():
+    """
+    Writes boards one at a time to a binary file object.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.f.write(MAGIC)
+
+    def write(self, game):
+        """
+        Appends one board.
+        """
+        self.f.write(RECORD.pack(game.height, game.width, len(game.mines)))
+        self.f.write(pack(game))
+
+
+def read_binary(f):
+    """
+    Yields each board in a binary file object as a Minesweeper game,
+    reading one record at a time.
+    """
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("not a Minesweeper board file")
+    while True:
+        header = f.read(RECORD.size)
+        if not header:
+            return
+        if len(header) < RECORD.size:
+            raise ValueError("truncated board record")
+        height, width, mines = RECORD.unpack(header)
+        size = height * ((width + 7) // 8)
+        data = f.read(size)
+        if len(data) < size:
+            raise ValueError("truncated board record")
+        cells = unpack(height, width, data)
+        if len(cells) != mines:
+            raise ValueError("board record has the wrong number of mines")
+        yield Minesweeper(height=height, width=width, layout=cells)
+
+
+class TextWriter():
+    """
+    Writes boards one at a time to a text file object.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.first = True
+
+    def write(self, game):
+        """
+        Appends one board.
+        """
+        lines = [] if self.first else [""]
+        lines.append(f"{game.height} {game.width}")
+        for i in range(game.height):
+            lines.append("".join(
+                MINE if (i, j) in game.mines else EMPTY
+                for j in range(game.width)
+            ))
+        self.f.write("\n".join(lines) + "\n")
+        self.first = False
+
+
+def read_text(f):
+    """
+    Yields each board in a text file object as a Minesweeper game,
+    reading one line at a time.
+    """
+    lines = (line.strip() for line in f)
+    for line in lines:
+        if not line:
+            continue
+        height, width = (int(n) for n in line.split())
+        cells = []
+        for i in range(height):
+            row = next(lines, "")
+            if len(row) != width or set(row) - {MINE, EMPTY}:
+                raise ValueError(f"bad board row {row!r}")
+            cells.extend((i, j) for j, c in enumerate(row) if c == MINE)
+        yield Minesweeper(height=height, width=width, layout=cells)
+
+
+class Corpus():
+    """
+    Boards stored in one binary or text file, loaded lazily: iterating
+    reads one board at a time, and indexing seeks straight to a board
+    using offsets found by skipping over the mine data.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.binary = f.read(len(MAGIC)) == MAGIC
+        self.offsets = None
+
+    def __iter__(self):
+        if self.binary:
+            with open(self.path, "rb") as f:
+                yield from read_binary(f)
+        else:
+            with open(self.path) as f:
+                yield from read_text(f)
+
+    def index(self):
+        """
+        Returns the offset of every record in a binary file.
+        """
+        if self.offsets is None:
+            if not self.binary:
+                raise TypeError("only binary corpora can be indexed")
+            self.offsets = []
+            with open(self.path, "rb") as f:
+                f.seek(len(MAGIC))
+                while True:
+                    offset = f.tell()
+                    header = f.read(RECORD.size)
+                    if len(header) < RECORD.size:
+                        break
+                    height, width, _ = RECORD.unpack(header)
+                    self.offsets.append(offset)
+                    f.seek(height * ((width + 7) // 8), 1)
+        return self.offsets
+
+    def __len__(self):
+        if self.binary:
+            return len(self.index())
+        return sum(1 for _ in self)
+
+    def __getitem__(self, n):
+        offset = self.index()[n]
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            height, width, _ = RECORD.unpack(f.read(RECORD.size))
+            data = f.read(height * ((width + 7) // 8))
+        return Minesweeper(
+            height=height, width=width, layout=unpack(height, width, data)
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write a corpus of seeded boards, and time loading it."
+    )
+    parser.add_argument("path")
+    parser.add_argument("--boards", type=int, default=1000)
+    parser.add_argument("--height", type=int, default=16)
+    parser.add_argument("--width", type=int, default=30)
+    parser.add_argument("--mines", type=int, default=99)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--text", action="store_true",
+                        help="write the text format instead of binary")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    with open(args.path, "w" if args.text else "wb") as f:
+        writer = TextWriter(f) if args.text else BinaryWriter(f)
+        for _ in range(args.boards):
+            writer.write(Minesweeper(
+                height=args.height, width=args.width, mines=args.mines,
+                seed=rng.getrandbits(32)
+            ))
+    print(f"Wrote {args.boards} boards in "
+          f"{time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    count = sum(1 for _ in Corpus(args.path))
+    print(f"Loaded {count} boards in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
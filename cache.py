@@ -0,0 +1,188 @@
+import collections
+import json
+import sqlite3
+
+from solver import ComponentSolution, MAX_COMPONENT_CELLS, solve_component
+
+# The eight rotations and reflections of the square grid
+SYMMETRIES = [
+    lambda i, j: (i, j),
+    lambda i, j: (i, -j),
+    lambda i, j: (-i, j),
+    lambda i, j: (-i, -j),
+    lambda i, j: (j, i),
+    lambda i, j: (j, -i),
+    lambda i, j: (-j, i),
+    lambda i, j: (-j, -i),
+]
+
+
+def signature(constraint_list):
+    """
+    Returns the canonical form of a component, the same for every
+    translation, rotation and reflection of it, together with a map
+    from each canonical cell back to the component's own cells.
+    """
+    cells = set()
+    for cell_set, _ in constraint_list:
+        cells.update(cell_set)
+
+    best = None
+    for symmetry in SYMMETRIES:
+        moved = {cell: symmetry(*cell) for cell in cells}
+        top = min(i for i, _ in moved.values())
+        left = min(j for _, j in moved.values())
+        moved = {cell: (i - top, j - left) for cell, (i, j) in moved.items()}
+        form = tuple(sorted(
+            (tuple(sorted(moved[cell] for cell in cell_set)), count)
+            for cell_set, count in constraint_list
+        ))
+        if best is None or form < best[0]:
+            best = (form, {new: old for old, new in moved.items()})
+    return best
+
+
+def expand(result, cells):
+    """
+    Returns the ComponentSolution for cached (totals, mine_counts) of
+    a canonical form, on the component's own cells.
+    """
+    totals, mine_counts = result
+    return ComponentSolution(
+        tuple(cells[cell] for cell in sorted(cells)),
+        totals,
+        {cells[cell]: counts for cell, counts in mine_counts.items()}
+    )
+
+
+class ComponentCache():
+    """
+    LRU cache of component solutions, keyed by canonical signature,
+    optionally backed by an SQLite file shared between processes.
+    """
+
+    def __init__(self, maxsize=65536, path=None):
+        self.maxsize = maxsize
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path, timeout=30)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS components "
+                "(signature TEXT PRIMARY KEY, result TEXT)"
+            )
+            self.db.commit()
+
+    def solve(self, constraint_list, limit=MAX_COMPONENT_CELLS):
+        """
+        Returns the ComponentSolution of a component, solving it only
+        if neither the memory nor the disk cache has seen its pattern.
+        """
+        form, cells = signature(constraint_list)
+        if len(cells) > limit:
+            return None
+
+        result = self.lookup(form)
+        if result is None:
+            self.misses += 1
+            canonical = [
+                (frozenset(cell_set), count) for cell_set, count in form
+            ]
+            solution = solve_component(canonical, limit)
+            result = (solution.totals, solution.mine_counts)
+            self.store(form, result)
+        else:
+            self.hits += 1
+        return expand(result, cells)
+
+    def get(self, constraint_list):
+        """
+        Returns the ComponentSolution of a component if its pattern
+        has been seen, or None, without solving anything.
+        """
+        form, cells = signature(constraint_list)
+        result = self.lookup(form)
+        if result is None:
+            return None
+        self.hits += 1
+        return expand(result, cells)
+
+    def add(self, constraint_list, solution):
+        """
+        Caches the solution of a component solved elsewhere.
+        """
+        form, cells = signature(constraint_list)
+        self.misses += 1
+        canonical = {cell: new for new, cell in cells.items()}
+        self.store(form, (solution.totals, {
+            canonical[cell]: counts
+            for cell, counts in solution.mine_counts.items()
+        }))
+
+    def lookup(self, form):
+        """
+        Returns the cached (totals, mine_counts) for a canonical form,
+        or None.
+        """
+        if form in self.entries:
+            self.entries.move_to_end(form)
+            return self.entries[form]
+        if self.db is None:
+            return None
+        row = self.db.execute(
+            "SELECT result FROM components WHERE signature = ?",
+            (repr(form),)
+        ).fetchone()
+        if row is None:
+            return None
+        data = json.loads(row[0])
+        result = (
+            {k: n for k, n in data["totals"]},
+            {(i, j): {k: n for k, n in counts}
+             for i, j, counts in data["cells"]}
+        )
+        self.remember(form, result)
+        return result
+
+    def store(self, form, result):
+        """
+        Adds a solved component to the memory and disk caches.
+        """
+        self.remember(form, result)
+        if self.db is None:
+            return
+        totals, mine_counts = result
+        data = {
+            "totals": sorted(totals.items()),
+            "cells": [
+                [i, j, sorted(counts.items())]
+                for (i, j), counts in sorted(mine_counts.items())
+            ]
+        }
+        self.db.execute(
+            "INSERT OR IGNORE INTO components VALUES (?, ?)",
+            (repr(form), json.dumps(data))
+        )
+        self.db.commit()
+
+    def remember(self, form, result):
+        """
+        Adds an entry to the memory cache, evicting the least
+        recently used entry when full.
+        """
+        self.entries[form] = result
+        self.entries.move_to_end(form)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def close(self):
+        """
+        Closes the disk store, if any.
+        """
+        if self.db is not None:
+            self.db.close()
+            self.db = None
@@ -0,0 +1,297 @@
+import argparse
+import io
+import random
+import sys
+
+from boardio import TextWriter
+from cache import ComponentCache
+from minesweeper import Minesweeper, MinesweeperAI
+
+
+class Engine():
+    """
+    Wraps a MinesweeperAI, exposing the marks it has made.
+    """
+
+    def __init__(self, ai):
+        self.ai = ai
+
+    def add_knowledge(self, cell, count):
+        self.ai.add_knowledge(cell, count)
+
+    @property
+    def mines(self):
+        return self.ai.mines
+
+    @property
+    def safes(self):
+        return self.ai.safes
+
+
+class SnapshotEngine(Engine):
+    """
+    Rebuilds its AI with from_snapshot from every count seen so far,
+    after each move.
+    """
+
+    def __init__(self, height, width, mines):
+        super().__init__(MinesweeperAI(height=height, width=width))
+        self.height = height
+        self.width = width
+        self.counts = {}
+
+    def add_knowledge(self, cell, count):
+        self.counts[cell] = count
+        self.ai = MinesweeperAI.from_snapshot(
+            self.counts, height=self.height, width=self.width
+        )
+
+
+class ReloadEngine(Engine):
+    """
+    Saves its AI and loads it back after each move.
+    """
+
+    def __init__(self, height, width, mines):
+        super().__init__(
+            MinesweeperAI(height=height, width=width, total_mines=mines)
+        )
+
+    def add_knowledge(self, cell, count):
+        self.ai.add_knowledge(cell, count)
+        f = io.BytesIO()
+        self.ai.save(f)
+        f.seek(0)
+        self.ai = MinesweeperAI.load(f)
+
+
+class LookaheadEngine(Engine):
+    """
+    Runs the lookahead search after each move, so that anything its
+    checkpoints and rollbacks leave behind shows up in later marks.
+    The budget is large enough that most small boards are searched
+    fully.
+    """
+
+    def __init__(self, height, width, mines):
+        super().__init__(MinesweeperAI(
+            height=height, width=width, total_mines=mines, lookahead=1,
+            lookahead_budget=0.2
+        ))
+
+    def add_knowledge(self, cell, count):
+        self.ai.add_knowledge(cell, count)
+        if self.ai.knowledge and self.ai.make_safe_move() is None:
+            self.ai.lookahead.choose(self.ai)
+
+
+class CacheEngine(Engine):
+    """
+    Solves the frontier after each move through one ComponentCache
+    shared by every board, so cached solutions are mapped back onto
+    components in other places and orientations.
+    """
+
+    cache = ComponentCache()
+
+    def __init__(self, height, width, mines):
+        super().__init__(MinesweeperAI(
+            height=height, width=width, total_mines=mines, cache=self.cache
+        ))
+
+    def add_knowledge(self, cell, count):
+        self.ai.add_knowledge(cell, count)
+        self.ai.solve_frontier()
+
+
+# Engines by name, each built from (height, width, mines); the
+# reference is the plain sentence engine with no shortcuts
+ENGINES = {
+    "reference": lambda h, w, m: MinesweeperAI(
+        height=h, width=w, patterns=False
+    ),
+    "default": lambda h, w, m: MinesweeperAI(height=h, width=w),
+    "patterns": lambda h, w, m: MinesweeperAI(
+        height=h, width=w, patterns=True
+    ),
+    "endgame": lambda h, w, m: MinesweeperAI(
+        height=h, width=w, total_mines=m
+    ),
+    "sat": lambda h, w, m: MinesweeperAI(height=h, width=w, backend="sat"),
+    "budget": lambda h, w, m: MinesweeperAI(
+        height=h, width=w, knowledge_budget=4096
+    ),
+    "wrap": lambda h, w, m: MinesweeperAI(
+        height=h, width=w, total_mines=m, wrap=True
+    ),
+    "snapshot": SnapshotEngine,
+    "reload": ReloadEngine,
+    "lookahead": LookaheadEngine,
+    "cache": CacheEngine,
+}
+
+# Engines that play on a torus, checked against a board that wraps
+WRAPPED = {"wrap"}
+
+
+def random_board(rng, max_size):
+    """
+    Returns (height, width, mines) for a random board, often a tiny
+    or pathological one: a single row or column, no mines, or every
+    cell but one a mine.
+    """
+    height = rng.randint(1, max_size)
+    width = rng.randint(1, max_size)
+    kind = rng.random()
+    if kind < 0.1:
+        height = 1
+    elif kind < 0.2:
+        width = 1
+    cells = height * width
+    kind = rng.random()
+    if kind < 0.1:
+        mines = 0
+    elif kind < 0.2:
+        mines = cells - 1
+    else:
+        mines = rng.randint(0, cells - 1)
+    return height, width, mines
+
+
+def play(rng, game):
+    """
+    Returns a random order in which to reveal every safe cell.
+    """
+    moves = [
+        (i, j)
+        for i in range(game.height)
+        for j in range(game.width)
+        if (i, j) not in game.mines
+    ]
+    rng.shuffle(moves)
+    return moves
+
+
+def check(name, height, width, layout, moves):
+    """
+    Replays `moves` on a board with mines at `layout` through one
+    engine, checking after every move that it only marks cells
+    that truly are mines, or truly are safe. Returns a description
+    of the first failure, or None.
+    """
+    game = Minesweeper(height=height, width=width, layout=layout,
+                       wrap=name in WRAPPED)
+    try:
+        engine = ENGINES[name](height, width, len(game.mines))
+        for n, cell in enumerate(moves):
+            engine.add_knowledge(cell, game.nearby_mines(cell))
+            wrong = set(engine.mines) - game.mines
+            if wrong:
+                return f"move {n + 1}: marked safe cells {sorted(wrong)} as mines"
+            wrong = set(engine.safes) & game.mines
+            if wrong:
+                return f"move {n + 1}: marked mines {sorted(wrong)} as safe"
+    except Exception as e:
+        return f"raised {type(e).__name__}: {e}"
+    return None
+
+
+def shrink(name, height, width, layout, moves):
+    """
+    Makes a failing case smaller while it keeps failing: fewer moves,
+    fewer mines, and fewer rows and columns. Returns the smallest
+    case found.
+    """
+    case = (height, width, sorted(layout), list(moves))
+    progress = True
+    while progress:
+        progress = False
+        for smaller in candidates(*case):
+            if check(name, *smaller) is not None:
+                case = smaller
+                progress = True
+                break
+    return case
+
+
+def candidates(height, width, layout, moves):
+    """
+    Yields every case one step smaller than the given one.
+    """
+    for n in range(len(moves)):
+        yield height, width, layout, moves[:n] + moves[n + 1:]
+    for n in range(len(layout)):
+        yield height, width, layout[:n] + layout[n + 1:], moves
+    for di, dj in ((1, 0), (0, 1)):
+        for top, left in ((0, 0), (di, dj)):
+            if height - di < 1 or width - dj < 1:
+                continue
+
+            def move(cell):
+                return (cell[0] - top, cell[1] - left)
+
+            def keep(cell):
+                i, j = move(cell)
+                return 0 <= i < height - di and 0 <= j < width - dj
+
+            yield (height - di, width - dj,
+                   [move(cell) for cell in layout if keep(cell)],
+                   [move(cell) for cell in moves
+                    if keep(cell)])
+
+
+def fuzz(names, games, seed=0, max_size=8):
+    """
+    Plays `games` random boards through the reference engine and
+    every named engine. Returns (engine, failure, shrunk case) for
+    each engine that failed on some board, shrinking only the first
+    failure of each.
+    """
+    rng = random.Random(seed)
+    failures = {}
+    for _ in range(games):
+        height, width, mines = random_board(rng, max_size)
+        game = Minesweeper(height=height, width=width, mines=mines,
+                           seed=rng.getrandbits(32))
+        moves = play(rng, game)
+        for name in ["reference"] + names:
+            if name in failures:
+                continue
+            failure = check(name, height, width, game.mines, moves)
+            if failure is not None:
+                case = shrink(name, height, width, game.mines, moves)
+                failures[name] = (check(name, *case), case)
+    return [(name, failure, case) for name, (failure, case) in failures.items()]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check that every AI engine only ever marks cells "
+                    "correctly, on random boards."
+    )
+    parser.add_argument("engines", nargs="*", default=None,
+                        help=f"engines to check, from {', '.join(ENGINES)}")
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-size", type=int, default=8)
+    args = parser.parse_args()
+
+    names = args.engines or [name for name in ENGINES if name != "reference"]
+    for name in names:
+        if name not in ENGINES:
+            parser.error(f"unknown engine {name!r}")
+    failures = fuzz(names, args.games, args.seed, args.max_size)
+    for name, failure, (height, width, layout, moves) in failures:
+        print(f"{name}: {failure}")
+        TextWriter(sys.stdout).write(
+            Minesweeper(height=height, width=width, layout=layout)
+        )
+        print(f"moves: {moves}")
+        print()
+    print(f"{args.games} boards, {len(failures)} failing engines")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import argparse
+import concurrent.futures
+import random
+import sqlite3
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+
+def neighborhood(cell, height, width):
+    """
+    Returns `cell` and every cell within one row and column of it.
+    """
+    return {
+        (i, j)
+        for i in range(cell[0] - 1, cell[0] + 2)
+        for j in range(cell[1] - 1, cell[1] + 2)
+        if 0 <= i < height and 0 <= j < width
+    }
+
+
+def solve(game, first):
+    """
+    Plays `game` from the `first` click using deduction only.
+    Returns the set of revealed cells; the board needs no guessing
+    if that is every safe cell.
+    """
+    ai = MinesweeperAI(height=game.height, width=game.width)
+    revealed = set()
+    move = first
+    while True:
+        while move is not None:
+            revealed.add(move)
+            ai.add_knowledge(move, game.nearby_mines(move))
+            move = ai.make_safe_move()
+        if not ai.solve_frontier():
+            return revealed
+        move = ai.make_safe_move()
+
+
+def repair(game, revealed, first, rng):
+    """
+    Moves one mine that blocks deduction, next to the revealed area,
+    to a random cell away from it. Returns False if there is nowhere
+    to move it.
+    """
+    near = set()
+    for cell in revealed:
+        near |= neighborhood(cell, game.height, game.width)
+    blocking = sorted(game.mines & near)
+    targets = sorted(
+        (i, j)
+        for i in range(game.height)
+        for j in range(game.width)
+        if (i, j) not in near
+        and (i, j) not in game.mines
+        and (i, j) not in neighborhood(first, game.height, game.width)
+    )
+    if not blocking or not targets:
+        return False
+    old = rng.choice(blocking)
+    new = rng.choice(targets)
+    game.mines.remove(old)
+    game.board[old[0]][old[1]] = False
+    game.mines.add(new)
+    game.board[new[0]][new[1]] = True
+    return True
+
+
+def generate(height=8, width=8, mines=8, seed=0, first=None, repairs=20):
+    """
+    Returns a Minesweeper board, deterministic in `seed`, that can be
+    solved from the `first` click (the centre by default) without
+    guessing. Boards that get stuck are repaired a few times before
+    a new one is drawn.
+    """
+    if first is None:
+        first = (height // 2, width // 2)
+    rng = random.Random(seed)
+    clear = neighborhood(first, height, width)
+    candidates = [
+        (i, j) for i in range(height) for j in range(width)
+        if (i, j) not in clear
+    ]
+    if mines > len(candidates):
+        raise ValueError("too many mines to keep the first click clear")
+
+    safe_cells = height * width - mines
+    while True:
+        game = Minesweeper(
+            height=height, width=width, layout=rng.sample(candidates, mines)
+        )
+        for _ in range(repairs + 1):
+            revealed = solve(game, first)
+            if len(revealed) == safe_cells:
+                return game
+            if not repair(game, revealed, first, rng):
+                break
+
+
+class BoardPool():
+    """
+    On-disk stock of no-guess boards in an SQLite file,
+    indexed by size, mine count, first click and seed.
+    """
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS boards ("
+            "height INTEGER, width INTEGER, mines INTEGER, "
+            "first_i INTEGER, first_j INTEGER, seed INTEGER, layout BLOB, "
+            "PRIMARY KEY (height, width, mines, first_i, first_j, seed))"
+        )
+        self.db.commit()
+
+    def add(self, game, first, seed):
+        """
+        Stores a board.
+        """
+        layout = bytearray((game.height * game.width + 7) // 8)
+        for i, j in game.mines:
+            n = i * game.width + j
+            layout[n // 8] |= 1 << (n % 8)
+        self.db.execute(
+            "INSERT OR REPLACE INTO boards VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (game.height, game.width, len(game.mines), first[0], first[1],
+             seed, bytes(layout))
+        )
+
+    def get(self, height, width, mines, seed, first=None):
+        """
+        Returns the stored board for these parameters, or None.
+        """
+        if first is None:
+            first = (height // 2, width // 2)
+        row = self.db.execute(
+            "SELECT layout FROM boards WHERE height = ? AND width = ? "
+            "AND mines = ? AND first_i = ? AND first_j = ? AND seed = ?",
+            (height, width, mines, first[0], first[1], seed)
+        ).fetchone()
+        if row is None:
+            return None
+        layout = row[0]
+        return Minesweeper(height=height, width=width, layout=[
+            divmod(n, width)
+            for n in range(height * width)
+            if layout[n // 8] >> (n % 8) & 1
+        ])
+
+    def seeds(self, height, width, mines, first=None):
+        """
+        Returns the seeds stored for these parameters.
+        """
+        if first is None:
+            first = (height // 2, width // 2)
+        return [seed for seed, in self.db.execute(
+            "SELECT seed FROM boards WHERE height = ? AND width = ? "
+            "AND mines = ? AND first_i = ? AND first_j = ? ORDER BY seed",
+            (height, width, mines, first[0], first[1])
+        )]
+
+    def commit(self):
+        """
+        Writes added boards to disk.
+        """
+        self.db.commit()
+
+    def close(self):
+        """
+        Closes the pool file.
+        """
+        self.db.close()
+
+
+def fill(path, height, width, mines, seeds, first=None, workers=None):
+    """
+    Generates every board in `seeds` that the pool at `path` does not
+    have yet, in parallel, and stores them. Returns how many were added.
+    """
+    if first is None:
+        first = (height // 2, width // 2)
+    pool = BoardPool(path)
+    missing = sorted(set(seeds) - set(pool.seeds(height, width, mines, first)))
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        boards = executor.map(
+            generate,
+            [height] * len(missing), [width] * len(missing),
+            [mines] * len(missing), missing, [first] * len(missing),
+            chunksize=8
+        )
+        for n, (seed, game) in enumerate(zip(missing, boards)):
+            pool.add(game, first, seed)
+            if n % 100 == 99:
+                pool.commit()
+    pool.commit()
+    pool.close()
+    return len(missing)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build a pool of Minesweeper boards that need no guessing."
+    )
+    parser.add_argument("pool", help="SQLite file to add boards to")
+    parser.add_argument("--height", type=int, default=8)
+    parser.add_argument("--width", type=int, default=8)
+    parser.add_argument("--mines", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    seeds = range(args.seed, args.seed + args.count)
+    added = fill(args.pool, args.height, args.width, args.mines, seeds,
+                 workers=args.workers)
+    print(f"Added {added} boards to {args.pool}")
+
+
+if __name__ == "__main__":
+    main()
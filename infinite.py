@@ -0,0 +1,103 @@
+import hashlib
+import random
+
+from minesweeper import Minesweeper
+
+
+class InfiniteMinesweeper(Minesweeper):
+    """
+    Minesweeper game on a board with no edges.
+    Mines are placed one fixed-size chunk at a time, the first time
+    any cell of the chunk is looked at, from a hash of the seed and
+    the chunk's coordinates, so only explored chunks are in memory.
+    """
+
+    def __init__(self, density=0.16, seed=0, chunk_size=32):
+
+        # An unbounded board has no height or width
+        self.height = None
+        self.width = None
+        self.density = density
+        self.seed = seed
+        self.chunk_size = chunk_size
+
+        # Mines of every chunk generated so far, keyed by chunk
+        self.chunks = {}
+        self.mines = set()
+
+        # At first, player has found no mines
+        self.reset()
+
+    def chunk(self, cell):
+        """
+        Returns the set of mines in the chunk containing `cell`,
+        generating the chunk if it has not been seen before.
+        """
+        key = (cell[0] // self.chunk_size, cell[1] // self.chunk_size)
+        if key not in self.chunks:
+            digest = hashlib.blake2b(
+                f"{self.seed}:{key[0]}:{key[1]}".encode(), digest_size=8
+            ).digest()
+            rng = random.Random(int.from_bytes(digest, "little"))
+            top = key[0] * self.chunk_size
+            left = key[1] * self.chunk_size
+            mines = frozenset(
+                (top + i, left + j)
+                for i in range(self.chunk_size)
+                for j in range(self.chunk_size)
+                if rng.random() < self.density
+            )
+            self.chunks[key] = mines
+            self.mines |= mines
+        return self.chunks[key]
+
+    def print(self):
+        """
+        Prints a text-based representation of where mines are
+        located, over the chunks generated so far.
+        """
+        if not self.chunks:
+            return
+        rows = [i for i, _ in self.chunks]
+        columns = [j for _, j in self.chunks]
+        top = min(rows) * self.chunk_size
+        left = min(columns) * self.chunk_size
+        bottom = (max(rows) + 1) * self.chunk_size
+        right = (max(columns) + 1) * self.chunk_size
+        lines = []
+        for i in range(top, bottom):
+            lines.append("--" * (right - left) + "-")
+            lines.append("".join(
+                "|X" if (i, j) in self.mines else "| "
+                for j in range(left, right)
+            ) + "|")
+        lines.append("--" * (right - left) + "-")
+        print("\n".join(lines))
+
+    def is_mine(self, cell):
+        return cell in self.chunk(cell)
+
+    def nearby_mines(self, cell):
+        """
+        Returns the number of mines that are
+        within one row and column of a given cell,
+        not including the cell itself.
+        """
+        count = 0
+        for i in range(cell[0] - 1, cell[0] + 2):
+            for j in range(cell[1] - 1, cell[1] + 2):
+                if (i, j) != cell and self.is_mine((i, j)):
+                    count += 1
+        return count
+
+    def won(self):
+        """
+        A board with no edges can never be cleared.
+        """
+        return False
+
+    def over(self):
+        """
+        Checks if a mine has been hit.
+        """
+        return self.lost
@@ -0,0 +1,69 @@
+import argparse
+import random
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+
+def derived_bytes(ai):
+    """
+    Returns the bytes taken up by the derived sentences, which are
+    the ones the knowledge budget may evict.
+    """
+    return sum(
+        sentence.size() for sentence in ai.knowledge if sentence.derived
+    )
+
+
+def report(height, width, mines, seed, budget):
+    """
+    Plays one seeded game and returns a row per move: the move number,
+    the cell, the number of sentences and how many were derived, and
+    the bytes taken up by the knowledge base and by its derived
+    sentences, measured on the sentences and their cell sets
+    themselves.
+    """
+    random.seed(seed)
+    game = Minesweeper(height=height, width=width, mines=mines, seed=seed)
+    ai = MinesweeperAI(height=height, width=width, knowledge_budget=budget)
+
+    rows = []
+    while not game.over():
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+        if move is None or move in ai.moves_made:
+            break
+        count = game.reveal(move)
+        if count is None:
+            break
+        ai.add_knowledge(move, count)
+        rows.append((
+            len(ai.moves_made), move, len(ai.knowledge),
+            sum(sentence.derived for sentence in ai.knowledge),
+            ai.knowledge_size(), derived_bytes(ai)
+        ))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report MinesweeperAI knowledge memory per move."
+    )
+    parser.add_argument("--height", type=int, default=16)
+    parser.add_argument("--width", type=int, default=16)
+    parser.add_argument("--mines", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--budget", type=int, default=None,
+                        help="knowledge budget in bytes")
+    args = parser.parse_args()
+
+    rows = report(args.height, args.width, args.mines, args.seed, args.budget)
+    print(f"{'move':>6}{'cell':>12}{'sentences':>11}{'derived':>9}"
+          f"{'bytes':>11}{'derived b':>11}")
+    for move, cell, sentences, derived, size, derived_size in rows:
+        print(f"{move:>6}{str(cell):>12}{sentences:>11}{derived:>9}"
+              f"{size:>11}{derived_size:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import argparse
+import asyncio
+import json
+import time
+
+
+class Client():
+    """
+    One connection to a game server, sending a request and
+    waiting for its response.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.latencies = []
+
+    async def request(self, **request):
+        """
+        Sends a request and returns the decoded response,
+        recording how long it took.
+        """
+        start = time.perf_counter()
+        self.writer.write(json.dumps(request).encode() + b"\n")
+        await self.writer.drain()
+        response = json.loads(await self.reader.readline())
+        self.latencies.append(time.perf_counter() - start)
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response
+
+
+async def play(client, deadline, height, width, mines):
+    """
+    Plays games by always following the server's hint,
+    until the deadline passes.
+    """
+    games = 0
+    while time.perf_counter() < deadline:
+        session = (await client.request(
+            op="new", height=height, width=width, mines=mines
+        ))["session"]
+        while time.perf_counter() < deadline:
+            cell = (await client.request(op="hint", session=session))["cell"]
+            if cell is None:
+                break
+            result = await client.request(
+                op="reveal", session=session, cell=cell
+            )
+            if result["lost"] or result["won"]:
+                break
+        await client.request(op="close", session=session)
+        games += 1
+    return games
+
+
+def percentile(values, fraction):
+    """
+    Returns the value at `fraction` of the way through sorted values.
+    """
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def run(host, port, clients, duration, height, width, mines):
+    """
+    Runs `clients` concurrent players for `duration` seconds and
+    returns (games played, request latencies, elapsed seconds).
+    """
+    connections = [
+        Client(*await asyncio.open_connection(host, port))
+        for _ in range(clients)
+    ]
+    start = time.perf_counter()
+    games = await asyncio.gather(*[
+        play(client, start + duration, height, width, mines)
+        for client in connections
+    ])
+    elapsed = time.perf_counter() - start
+    for client in connections:
+        client.writer.close()
+    latencies = [t for client in connections for t in client.latencies]
+    return sum(games), latencies, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure a local Minesweeper game server under load."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--height", type=int, default=8)
+    parser.add_argument("--width", type=int, default=8)
+    parser.add_argument("--mines", type=int, default=8)
+    args = parser.parse_args()
+
+    games, latencies, elapsed = asyncio.run(run(
+        args.host, args.port, args.clients, args.duration,
+        args.height, args.width, args.mines
+    ))
+    if not latencies:
+        print("No requests completed.")
+        return
+
+    print(f"Games: {games}")
+    print(f"Requests: {len(latencies)} ({len(latencies) / elapsed:.0f}/s)")
+    for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+        print(f"{name}: {percentile(latencies, fraction) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
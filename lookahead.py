@@ -0,0 +1,195 @@
+import collections
+import time
+
+from cache import signature
+
+
+class Lookahead():
+    """
+    Bounded-depth expectimax search over guesses.
+    Each candidate cell is scored by the chance that it is safe,
+    times the expected value of the positions each revealed count
+    leads to. Positions are cached in an LRU transposition table.
+    """
+
+    def __init__(self, depth=1, width=6, budget=0.05, table_size=4096):
+
+        # Number of reveals to look ahead, candidates tried per position,
+        # and CPU seconds allowed per move
+        self.depth = depth
+        self.width = width
+        self.budget = budget
+
+        # Transposition table of position values, in LRU order
+        self.table = collections.OrderedDict()
+        self.table_size = table_size
+
+        self.deadline = None
+
+    def key(self, ai, depth, probabilities):
+        """
+        Returns a canonical key for the AI's current position, the
+        same for every translation, rotation and reflection of it.
+        A position's value depends on more than its constraints, so
+        the key also holds the shape around them: the unknown cells a
+        reveal on the frontier would bring in, the walls next to
+        either, and how many neighbours the stand-in interior cell
+        has. These go into the same normal form as the component
+        cache, as pseudo-constraints with negative counts.
+        """
+        constraint_list = ai.constraints()
+        frontier = set()
+        for cells, _ in constraint_list:
+            frontier.update(cells)
+        beyond = set()
+        for cell in frontier:
+            for neighbor in ai.neighbors(cell):
+                if neighbor in probabilities and neighbor not in frontier:
+                    beyond.add(neighbor)
+        walls = set()
+        if ai.height is not None and not ai.wrap:
+            for i, j in frontier | beyond:
+                for di in (-1, 0, 1):
+                    for dj in (-1, 0, 1):
+                        if not (0 <= i + di < ai.height
+                                and 0 <= j + dj < ai.width):
+                            walls.add((i + di, j + dj))
+        shape = list(constraint_list)
+        shape.append((frozenset(beyond), -1))
+        shape.append((frozenset(walls), -2))
+        form = signature(shape)[0] if frontier else ()
+
+        interior = [cell for cell in probabilities if cell not in frontier]
+        neighbors = min(
+            (len(ai.neighbors(cell)) for cell in interior), default=None
+        )
+        unknown = None if ai.height is None else ai.unknown_count()
+        mines_left = None
+        if ai.total_mines is not None:
+            mines_left = ai.total_mines - len(ai.mine_ids)
+        return (form, neighbors, unknown, mines_left, depth)
+
+    def expired(self):
+        """
+        Checks if the CPU budget for this move has run out.
+        """
+        return time.perf_counter() > self.deadline
+
+    def choose(self, ai):
+        """
+        Returns the candidate cell with the highest expected value,
+        or the best found so far once the budget runs out.
+        Candidates are tried safest first, so the first is always
+        scored.
+        """
+        self.deadline = time.perf_counter() + self.budget
+        probabilities = ai.probabilities()
+        best = None
+        best_value = -1
+        for cell in self.candidates(ai, probabilities):
+            if best is not None and self.expired():
+                break
+            value = self.score(ai, cell, probabilities, self.depth)
+            if value > best_value:
+                best, best_value = cell, value
+        return best
+
+    def candidates(self, ai, probabilities):
+        """
+        Returns the `width` most promising cells to try: the safest
+        frontier cells, plus the unconstrained cell with the fewest
+        neighbours as a stand-in for every other unconstrained cell.
+        """
+        frontier = set()
+        for cells, _ in ai.constraints():
+            frontier.update(cells)
+        interior = [cell for cell in probabilities if cell not in frontier]
+        cells = [cell for cell in probabilities if cell in frontier]
+        if interior:
+            cells.append(min(interior, key=lambda cell: (
+                len(ai.neighbors(cell)), cell
+            )))
+        cells.sort(key=lambda cell: (probabilities[cell], cell))
+        return cells[:self.width]
+
+    def score(self, ai, cell, probabilities, depth):
+        """
+        Returns the expected value of revealing `cell`.
+        """
+        safe = 1 - probabilities[cell]
+        if depth == 0 or safe == 0:
+            return safe
+        value = 0
+        covered = 0
+        for count, chance in outcomes(ai, cell, probabilities):
+            if covered and self.expired():
+                break
+            ai.checkpoint()
+            ai.add_knowledge(cell, count)
+            value += chance * self.value(ai, depth - 1)
+            ai.rollback()
+            covered += chance
+
+        # Outcomes left out when the budget ran out are assumed to
+        # be worth the average of those explored
+        return safe * value / covered
+
+    def value(self, ai, depth):
+        """
+        Returns the chance of surviving the next `depth` + 1 moves
+        from the AI's current position.
+        """
+        if ai.make_safe_move() is not None:
+            return 1.0
+
+        probabilities = ai.probabilities()
+        if not probabilities:
+            return 1.0
+        key = self.key(ai, depth, probabilities)
+        if key in self.table:
+            self.table.move_to_end(key)
+            return self.table[key]
+
+        if depth == 0:
+            value = 1 - min(probabilities.values())
+        elif self.expired():
+            return 1 - min(probabilities.values())
+        else:
+            value = max(
+                self.score(ai, cell, probabilities, depth)
+                for cell in self.candidates(ai, probabilities)
+            )
+
+            # A search the budget may have cut short is not stored,
+            # since the table outlives this move
+            if self.expired():
+                return value
+
+        self.table[key] = value
+        if len(self.table) > self.table_size:
+            self.table.popitem(last=False)
+        return value
+
+
+def outcomes(ai, cell, probabilities):
+    """
+    Returns (count, probability) pairs for the number revealed at
+    `cell`, treating its unknown neighbours as independent.
+    """
+    known = 0
+    distribution = [1.0]
+    for neighbor in ai.neighbors(cell):
+        if neighbor in ai.mines:
+            known += 1
+        elif neighbor in probabilities:
+            p = probabilities[neighbor]
+            shifted = [0.0] * (len(distribution) + 1)
+            for k, chance in enumerate(distribution):
+                shifted[k] += chance * (1 - p)
+                shifted[k + 1] += chance * p
+            distribution = shifted
+    return [
+        (known + k, chance)
+        for k, chance in enumerate(distribution)
+        if chance > 0
+    ]
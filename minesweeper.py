@@ -1,6 +1,58 @@
+import collections.abc
 import itertools
+import marshal
 import random
-import copy
+import struct
+import sys
+from array import array
+
+import patterns as pattern_library
+import solver
+from cache import ComponentCache
+from lookahead import Lookahead
+from sat import SatBackend
+from topology import CellIndex, topology
+
+
+# Saved AI files: magic and format version, then length-prefixed
+# sections
+SAVE_MAGIC = b"MSWAI\0"
+SAVE_VERSION = 1
+SAVE_HEADER = struct.Struct("<6sH")
+SECTION = struct.Struct("<Q")
+
+
+def write_section(f, data):
+    """
+    Writes bytes, or an array of 8-byte ints, as one section.
+    """
+    if isinstance(data, array):
+        if sys.byteorder != "little":
+            data = array(data.typecode, data)
+            data.byteswap()
+        data = data.tobytes()
+    f.write(SECTION.pack(len(data)))
+    f.write(data)
+
+
+def read_section(f, ints=False):
+    """
+    Reads one section as bytes, or as an array of 8-byte ints.
+    """
+    header = f.read(SECTION.size)
+    if len(header) < SECTION.size:
+        raise ValueError("truncated AI state")
+    size, = SECTION.unpack(header)
+    data = f.read(size)
+    if len(data) < size:
+        raise ValueError("truncated AI state")
+    if not ints:
+        return data
+    values = array("q")
+    values.frombytes(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
 
 
 class Minesweeper():
@@ -8,13 +60,18 @@ class Minesweeper():
     Minesweeper game representation
     """
 
-    def __init__(self, height=8, width=8, mines=8):
+    def __init__(self, height=8, width=8, mines=8, seed=None, layout=None,
+                 wrap=False):
 
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
         self.mines = set()
 
+        # Shared neighbour tables; with wrap, the board is a torus
+        self.wrap = wrap
+        self.topology = topology(height, width, wrap)
+
         # Initialize an empty field with no mines
         self.board = []
         for i in range(self.height):
@@ -23,31 +80,54 @@ class Minesweeper():
                 row.append(False)
             self.board.append(row)
 
-        # Add mines randomly
+        # Use the given mine cells, if any
+        if layout is not None:
+            for i, j in layout:
+                self.mines.add((i, j))
+                self.board[i][j] = True
+            mines = len(self.mines)
+
+        # Add mines randomly, reproducibly if a seed is given
+        rng = random if seed is None else random.Random(seed)
         while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
+            i = rng.randrange(height)
+            j = rng.randrange(width)
             if not self.board[i][j]:
                 self.mines.add((i, j))
                 self.board[i][j] = True
+        self.mine_count = len(self.mines)
 
         # At first, player has found no mines
+        self.reset()
+
+    def reset(self):
+        """
+        Clears the player's side of the game: revealed and flagged
+        cells, and whether a mine has been hit.
+        """
+        self.revealed = set()
+        self.flags = set()
+        self.lost = False
+
+        # Flagged cells that are mines, and the number that are not,
+        # kept up to date so checking for a win is constant time
         self.mines_found = set()
+        self.wrong_flags = 0
 
     def print(self):
         """
         Prints a text-based representation
         of where mines are located.
         """
+        lines = []
         for i in range(self.height):
-            print("--" * self.width + "-")
-            for j in range(self.width):
-                if self.board[i][j]:
-                    print("|X", end="")
-                else:
-                    print("| ", end="")
-            print("|")
-        print("--" * self.width + "-")
+            lines.append("--" * self.width + "-")
+            lines.append("".join(
+                "|X" if self.board[i][j] else "| "
+                for j in range(self.width)
+            ) + "|")
+        lines.append("--" * self.width + "-")
+        print("\n".join(lines))
 
     def is_mine(self, cell):
         i, j = cell
@@ -64,6 +144,14 @@ class Minesweeper():
         # Keep count of nearby mines
         count = 0
 
+        # Read the neighbours from the shared tables if there are any
+        if self.topology is not None:
+            width = self.width
+            for n in self.topology.neighbor_ids(cell[0] * width + cell[1]):
+                if self.board[n // width][n % width]:
+                    count += 1
+            return count
+
         # Loop over all cells within one row and column
         for i in range(cell[0] - 1, cell[0] + 2):
             for j in range(cell[1] - 1, cell[1] + 2):
@@ -73,17 +161,64 @@ class Minesweeper():
                     continue
 
                 # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
+                if self.wrap:
+                    if self.board[i % self.height][j % self.width]:
+                        count += 1
+                elif 0 <= i < self.height and 0 <= j < self.width:
                     if self.board[i][j]:
                         count += 1
-        print(count)
         return count
 
+    def reveal(self, cell):
+        """
+        Reveals a cell, removing any flag on it. Returns the number
+        of nearby mines, or None if the cell is a mine, which loses
+        the game.
+        """
+        if cell in self.flags:
+            self.flag(cell)
+        if self.is_mine(cell):
+            self.lost = True
+            return None
+        self.revealed.add(cell)
+        return self.nearby_mines(cell)
+
+    def flag(self, cell):
+        """
+        Toggles the flag on a cell that has not been revealed.
+        """
+        if cell in self.revealed:
+            return
+        mine = self.is_mine(cell)
+        if cell in self.flags:
+            self.flags.remove(cell)
+            if mine:
+                self.mines_found.remove(cell)
+            else:
+                self.wrong_flags -= 1
+        else:
+            self.flags.add(cell)
+            if mine:
+                self.mines_found.add(cell)
+            else:
+                self.wrong_flags += 1
+
     def won(self):
         """
-        Checks if all mines have been flagged.
+        Checks if all mines, and nothing else, have been flagged,
+        or if every safe cell has been revealed.
+        """
+        if self.lost:
+            return False
+        if len(self.mines_found) == self.mine_count and not self.wrong_flags:
+            return True
+        return len(self.revealed) == self.height * self.width - self.mine_count
+
+    def over(self):
+        """
+        Checks if the game has been won or lost.
         """
-        return self.mines_found == self.mines
+        return self.lost or self.won()
 
 
 class Sentence():
@@ -93,10 +228,15 @@ class Sentence():
     and a count of the number of those cells which are mines.
     """
 
-    def __init__(self, cells, count):
+    def __init__(self, cells, count, derived=False):
         self.cells = set(cells)
         self.count = count
 
+        # Whether the sentence was inferred from other sentences rather
+        # than revealed by the board, and the move it was last useful on
+        self.derived = derived
+        self.used = 0
+
     def __eq__(self, other):
         return self.cells == other.cells and self.count == other.count
 
@@ -104,6 +244,13 @@ class Sentence():
         return f"{self.cells} = {self.count}"
 
 
+    def size(self):
+        """
+        Returns the approximate number of bytes the sentence takes up.
+        """
+        return (sys.getsizeof(self) + sys.getsizeof(self.__dict__)
+                + sys.getsizeof(self.cells))
+
     def known_mines(self):
         """
         Returns the set of all cells in self.cells known to be mines.
@@ -125,7 +272,6 @@ class Sentence():
         a cell is known to be a mine.
         """
         if cell in self.cells:
-            print(f'markmine cell{cell} selfcells {self.cells} count {self.count}')
             self.cells.remove(cell)
             self.count = self.count - 1
             
@@ -139,46 +285,592 @@ class Sentence():
             self.cells.remove(cell)
 
 
+class CellSet(collections.abc.Set):
+    """
+    Read-only set-like view of cells, by (i, j), of a set of the
+    MinesweeperAI's cell IDs, with membership read from its flat
+    state array.
+    """
+
+    def __init__(self, ai, ids, flag):
+        self.ai = ai
+        self.ids = ids
+        self.flag = flag
+
+    @classmethod
+    def _from_iterable(cls, cells):
+        return set(cells)
+
+    def __contains__(self, cell):
+        n = self.ai.index.find(cell)
+        return n is not None and bool(self.ai.state[n] & self.flag)
+
+    def __iter__(self):
+        cells = self.ai.index.cells
+        for n in self.ids:
+            yield cells[n]
+
+    def __len__(self):
+        return len(self.ids)
+
+
 class MinesweeperAI():
     """
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    # Flags of a cell in the state array
+    MOVE = 1
+    SAFE = 2
+    MINE = 4
+
+    def __init__(self, height=8, width=8, lookahead=0, lookahead_budget=0.05,
+                 cache=None, patterns=False, total_mines=None,
+                 endgame_cells=40, backend="sentences",
+                 knowledge_budget=None, wrap=False, pool=None,
+                 pool_cells=solver.POOL_CELLS):
 
         # Set initial height and width
         self.height = height
         self.width = width
 
-        # Keep track of which cells have been clicked on
-        self.moves_made = set()
+        # Flat integer ID of every cell, and shared neighbour tables
+        # matching the board's
+        self.wrap = wrap
+        self.index = CellIndex(height, width, wrap)
+        self.topology = self.index.topology
 
-        # Keep track of cells known to be safe or mines
-        self.mines = set()
-        self.safes = set()
+        # Number of mines on the board, if known, and how few unknown
+        # cells there must be before the exact endgame solver runs
+        self.total_mines = total_mines
+        self.endgame_cells = endgame_cells
+
+        # Whether add_knowledge tries the local pattern tables first.
+        # Off by default: the lookup costs more on every move than
+        # the few moves it settles save. They assume a flat board, so
+        # are never used on a torus
+        self.patterns = patterns and not wrap
+
+        # Optional SAT backend that also decides which cells are forced
+        if backend not in ("sentences", "sat"):
+            raise ValueError(f"unknown backend {backend!r}")
+        self.sat = SatBackend() if backend == "sat" else None
+
+        # Optional cache.ComponentCache shared by frontier solves
+        self.cache = cache
+
+        # Optional process pool that solves frontier components of
+        # more than pool_cells cells concurrently; with one, every
+        # move also solves the frontier exactly
+        self.pool = pool
+        self.pool_cells = pool_cells
+
+        # Optional expectimax search used when the AI has to guess
+        self.lookahead = None
+        if lookahead:
+            self.lookahead = Lookahead(depth=lookahead, budget=lookahead_budget)
+
+        # Flags of every cell by ID, and the IDs of cells that have
+        # been clicked on, or are known to be safe or mines
+        self.state = bytearray(len(self.index.cells))
+        self.move_ids = set()
+        self.safe_ids = set()
+        self.mine_ids = set()
 
-        # List of sentences about the game known to be true
+        # The same cells by (i, j), for callers
+        self.moves_made = CellSet(self, self.move_ids, self.MOVE)
+        self.safes = CellSet(self, self.safe_ids, self.SAFE)
+        self.mines = CellSet(self, self.mine_ids, self.MINE)
+
+        # Count revealed by each cell clicked on, by ID
+        self.counts = {}
+
+        # List of sentences about the game known to be true,
+        # over cell IDs
         self.knowledge = []
+
+        # Approximate bytes the knowledge base may take up before derived
+        # sentences are evicted, and the number of moves seen so far
+        self.knowledge_budget = knowledge_budget
+        self.clock = 0
         
         self.surrounding_cells = set()
 
+        # Undo log of every mutation made while a checkpoint is open,
+        # and the trail length and clock at each open checkpoint
+        self.trail = []
+        self.checkpoints = []
+
+    @classmethod
+    def from_snapshot(cls, revealed_counts, flags=(), **options):
+        """
+        Builds an AI for a position in one pass, instead of replaying
+        add_knowledge cell by cell. `revealed_counts` maps each
+        revealed cell to its count, `flags` are cells known to be
+        mines, and `options` are passed to the constructor.
+        Every cell is marked before any sentence exists, each count
+        becomes one sentence over the cells still unknown, and then
+        inference runs once over the whole knowledge base.
+        """
+        ai = cls(**options)
+        revealed = dict(revealed_counts)
+        state = ai.state
+        for cell, count in revealed.items():
+            n = ai.cell_id(cell)
+            state[n] |= ai.MOVE
+            ai.move_ids.add(n)
+            ai.counts[n] = count
+            ai.mark_safe_id(n)
+        ai.clock = len(revealed)
+        for cell in flags:
+            ai.mark_mine_id(ai.cell_id(cell))
+
+        # With no sentences yet, marking costs nothing
+        for n, count in ai.counts.items():
+            if count == 0:
+                for neighbor in ai.neighbor_ids(n):
+                    if not state[neighbor] & ai.MINE:
+                        ai.mark_safe_id(neighbor)
+
+        for n, count in ai.counts.items():
+            cells = []
+            for neighbor in ai.neighbor_ids(n):
+                if state[neighbor] & ai.MINE:
+                    count -= 1
+                elif not state[neighbor] & ai.SAFE:
+                    cells.append(neighbor)
+            if cells:
+                ai.add_sentence(Sentence(cells, count))
+
+        ai.settle()
+        return ai
+
+    def settle(self):
+        """
+        Marks every cell a single sentence proves safe or a mine
+        until there are no more, then asks the frontier, endgame and
+        SAT solvers, and repeats until nothing new is found.
+        Returns the number of cells newly marked.
+        """
+        marked = 0
+        while True:
+            changed = True
+            while changed:
+                changed = False
+                for sentence in self.knowledge:
+                    if not sentence.cells:
+                        continue
+                    if sentence.count == 0:
+                        for n in list(sentence.cells):
+                            self.mark_safe_id(n)
+                            marked += 1
+                        changed = True
+                    elif len(sentence.cells) == sentence.count:
+                        for n in list(sentence.cells):
+                            self.mark_mine_id(n)
+                            marked += 1
+                        changed = True
+            solved = (self.solve_frontier() + self.solve_endgame()
+                      + self.solve_sat())
+            if not solved:
+                return marked
+            marked += solved
+
+    def save(self, f):
+        """
+        Writes the AI's full state to a binary file object: its
+        options and cell numbering, the cell state array, counts and
+        sentences as flat arrays, and the component cache and
+        lookahead table, if any. Positions inside a checkpoint cannot
+        be saved.
+        """
+        if self.checkpoints:
+            raise ValueError("cannot save inside a checkpoint")
+        options = {
+            "height": self.height,
+            "width": self.width,
+            "wrap": self.wrap,
+            "total_mines": self.total_mines,
+            "endgame_cells": self.endgame_cells,
+            "patterns": self.patterns,
+            "backend": "sentences" if self.sat is None else "sat",
+            "knowledge_budget": self.knowledge_budget,
+            "pool_cells": self.pool_cells,
+            "lookahead": 0,
+            "lookahead_budget": 0.05,
+        }
+        if self.lookahead is not None:
+            options["lookahead"] = self.lookahead.depth
+            options["lookahead_budget"] = self.lookahead.budget
+
+        f.write(SAVE_HEADER.pack(SAVE_MAGIC, SAVE_VERSION))
+        write_section(f, marshal.dumps((options, self.clock)))
+
+        # Cells numbered in order of use, on boards without tables
+        cells = array("q")
+        if self.index.ids is not None:
+            for cell in self.index.cells:
+                cells.extend(cell)
+        write_section(f, cells)
+        write_section(f, bytes(self.state))
+        counts = array("q")
+        for n, count in self.counts.items():
+            counts.extend((n, count))
+        write_section(f, counts)
+
+        # One (count, derived, used, size) row per sentence, then
+        # the cells of every sentence in order
+        sentences = array("q")
+        members = array("q")
+        for sentence in self.knowledge:
+            sentences.extend((sentence.count, sentence.derived,
+                              sentence.used, len(sentence.cells)))
+            members.extend(sentence.cells)
+        write_section(f, sentences)
+        write_section(f, members)
+
+        caches = {}
+        if self.cache is not None:
+            caches["components"] = (
+                self.cache.maxsize, list(self.cache.entries.items())
+            )
+        if self.lookahead is not None:
+            caches["lookahead"] = list(self.lookahead.table.items())
+        write_section(f, marshal.dumps(caches))
+
+    @classmethod
+    def load(cls, f, cache=None, pool=None):
+        """
+        Reads an AI written by save() from a binary file object.
+        Saved component solutions go into `cache`, or into a new
+        ComponentCache if none is given, and `pool` is used as the
+        constructor's. A SAT backend is rebuilt from the sentences
+        and known cells.
+        """
+        header = f.read(SAVE_HEADER.size)
+        if len(header) < SAVE_HEADER.size:
+            raise ValueError("not a saved MinesweeperAI")
+        magic, version = SAVE_HEADER.unpack(header)
+        if magic != SAVE_MAGIC:
+            raise ValueError("not a saved MinesweeperAI")
+        if version != SAVE_VERSION:
+            raise ValueError(f"unsupported AI state version {version}")
+
+        options, clock = marshal.loads(read_section(f))
+        cells = read_section(f, ints=True)
+        state = read_section(f)
+        counts = read_section(f, ints=True)
+        sentences = read_section(f, ints=True)
+        members = read_section(f, ints=True)
+        caches = marshal.loads(read_section(f))
+
+        if "components" in caches and cache is None:
+            cache = ComponentCache(maxsize=caches["components"][0])
+        ai = cls(cache=cache, pool=pool, **options)
+        ai.clock = clock
+
+        for n in range(0, len(cells), 2):
+            ai.index.id((cells[n], cells[n + 1]))
+        ai.state[:] = state
+        for n, flags in enumerate(ai.state):
+            if flags & ai.MOVE:
+                ai.move_ids.add(n)
+            if flags & ai.SAFE:
+                ai.safe_ids.add(n)
+            if flags & ai.MINE:
+                ai.mine_ids.add(n)
+        ai.counts = dict(zip(counts[0::2], counts[1::2]))
+
+        start = 0
+        for row in range(0, len(sentences), 4):
+            count, derived, used, size = sentences[row:row + 4]
+            sentence = Sentence(
+                members[start:start + size], count, derived=bool(derived)
+            )
+            sentence.used = used
+            ai.knowledge.append(sentence)
+            start += size
+
+        if ai.sat is not None:
+            for sentence in ai.knowledge:
+                ai.sat.add_sentence(sentence.cells, sentence.count)
+            for n in ai.mine_ids:
+                ai.sat.add_fact(n, True)
+            for n in ai.safe_ids:
+                ai.sat.add_fact(n, False)
+
+        if cache is not None:
+            for form, result in caches.get("components", (0, []))[1]:
+                cache.remember(form, result)
+        if ai.lookahead is not None:
+            ai.lookahead.table.update(caches.get("lookahead", []))
+        return ai
+
+    def checkpoint(self):
+        """
+        Opens a checkpoint. Every change made to the AI's knowledge
+        from now on is recorded on the trail, so it can be undone
+        with rollback() or kept with commit().
+        Returns the number of open checkpoints.
+        """
+        self.checkpoints.append((len(self.trail), self.clock))
+        return len(self.checkpoints)
+
+    def rollback(self):
+        """
+        Undoes every change made since the most recent checkpoint,
+        and closes that checkpoint.
+        """
+        mark, self.clock = self.checkpoints.pop()
+        while len(self.trail) > mark:
+            entry = self.trail.pop()
+            kind = entry[0]
+            if kind == "move":
+                self.move_ids.discard(entry[1])
+                self.state[entry[1]] &= ~self.MOVE
+                del self.counts[entry[1]]
+            elif kind == "safe":
+                self.safe_ids.discard(entry[1])
+                self.state[entry[1]] &= ~self.SAFE
+            elif kind == "mine":
+                self.mine_ids.discard(entry[1])
+                self.state[entry[1]] &= ~self.MINE
+            elif kind == "sentence":
+                self.knowledge.pop()
+            elif kind == "evict":
+                self.knowledge.insert(entry[1], entry[2])
+            elif kind == "cell":
+                _, sentence, n, count = entry
+                sentence.cells.add(n)
+                sentence.count = count
+            elif kind == "used":
+                entry[1].used = entry[2]
+
+    def commit(self):
+        """
+        Closes the most recent checkpoint, keeping its changes.
+        The changes stay undoable by any enclosing checkpoint.
+        Once the outermost checkpoint is committed, the sentences and
+        facts it kept are given to the SAT backend, which never sees
+        hypothetical ones, and the solving skipped inside the
+        checkpoint is done.
+        """
+        self.checkpoints.pop()
+        if self.checkpoints:
+            return
+        if self.sat is not None:
+            for entry in self.trail:
+                kind = entry[0]
+                if kind == "sentence":
+                    sentence = entry[1]
+                    self.sat.add_sentence(sentence.cells, sentence.count)
+                elif kind == "mine":
+                    self.sat.add_fact(entry[1], True)
+                elif kind == "safe":
+                    self.sat.add_fact(entry[1], False)
+        self.trail.clear()
+        if self.pool is not None:
+            self.solve_frontier()
+        self.solve_sat()
+
+    def add_sentence(self, sentence):
+        """
+        Adds a sentence to the knowledge base.
+        """
+        if self.checkpoints:
+            self.trail.append(("sentence", sentence))
+        elif self.sat is not None:
+            self.sat.add_sentence(sentence.cells, sentence.count)
+        sentence.used = self.clock
+        self.knowledge.append(sentence)
+
+    def touch(self, sentence):
+        """
+        Records that a sentence was useful on the current move.
+        """
+        if self.checkpoints:
+            self.trail.append(("used", sentence, sentence.used))
+        sentence.used = self.clock
+
+    def knowledge_size(self):
+        """
+        Returns the approximate number of bytes the knowledge base
+        takes up.
+        """
+        return sys.getsizeof(self.knowledge) + sum(
+            sentence.size() for sentence in self.knowledge
+        )
+
+    def enforce_budget(self, cell):
+        """
+        Evicts derived sentences until the knowledge base fits in
+        knowledge_budget. Empty sentences go first, then exact
+        duplicates of other sentences, then those unused for longest,
+        furthest from `cell` first. Sentences revealed by the board
+        are always kept, so every evicted sentence still follows from
+        what is left and no mark becomes wrong. Inference is lost,
+        though: add_knowledge derives at most one sentence per move,
+        so a safe cell or mine that needed an evicted sentence may be
+        found later than it would have been, or not at all.
+        """
+        if self.knowledge_budget is None:
+            return
+        size = self.knowledge_size()
+        if size <= self.knowledge_budget:
+            return
+
+        seen = set()
+        ranked = []
+        for index, sentence in enumerate(self.knowledge):
+            key = (frozenset(sentence.cells), sentence.count)
+            duplicate = key in seen
+            seen.add(key)
+            if not sentence.derived:
+                continue
+            if not sentence.cells:
+                rank = 0
+            elif duplicate:
+                rank = 1
+            else:
+                rank = 2
+            distance = max(
+                max(abs(self.index.cells[n][0] - cell[0]),
+                    abs(self.index.cells[n][1] - cell[1]))
+                for n in sentence.cells
+            ) if sentence.cells else 0
+            ranked.append((rank, sentence.used, -distance, index))
+        ranked.sort()
+
+        evicted = []
+        for _, _, _, index in ranked:
+            if size <= self.knowledge_budget:
+                break
+            size -= self.knowledge[index].size()
+            evicted.append(index)
+
+        # Remove from the back so the recorded indices stay valid
+        for index in sorted(evicted, reverse=True):
+            sentence = self.knowledge.pop(index)
+            if self.checkpoints:
+                self.trail.append(("evict", index, sentence))
+
+    def cell_id(self, cell):
+        """
+        Returns the ID of a cell, numbering it if it has none yet.
+        """
+        n = self.index.id(cell)
+        if n >= len(self.state):
+            self.state.extend(bytes(len(self.index.cells) - len(self.state)))
+        return n
+
+    def neighbor_ids(self, n):
+        """
+        Returns the IDs of the cells next to the cell with ID `n`.
+        """
+        ids = self.index.neighbor_ids(n)
+        if len(self.state) < len(self.index.cells):
+            self.state.extend(bytes(len(self.index.cells) - len(self.state)))
+        return ids
+
     def mark_mine(self, cell):
         """
         Marks a cell as a mine, and updates all knowledge
         to mark that cell as a mine as well.
         """
-        self.mines.add(cell)
+        self.mark_mine_id(self.cell_id(cell))
+
+    def mark_mine_id(self, n):
+        """
+        Marks the cell with ID `n` as a mine.
+        """
+        recording = bool(self.checkpoints)
+        if not self.state[n] & self.MINE:
+            if recording:
+                self.trail.append(("mine", n))
+            elif self.sat is not None:
+                self.sat.add_fact(n, True)
+            self.state[n] |= self.MINE
+            self.mine_ids.add(n)
         for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+            if recording and n in sentence.cells:
+                self.trail.append(("cell", sentence, n, sentence.count))
+            sentence.mark_mine(n)
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
-        self.safes.add(cell)
+        self.mark_safe_id(self.cell_id(cell))
+
+    def mark_safe_id(self, n):
+        """
+        Marks the cell with ID `n` as safe.
+        """
+        recording = bool(self.checkpoints)
+        if not self.state[n] & self.SAFE:
+            if recording:
+                self.trail.append(("safe", n))
+            elif self.sat is not None:
+                self.sat.add_fact(n, False)
+            self.state[n] |= self.SAFE
+            self.safe_ids.add(n)
         for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+            if recording and n in sentence.cells:
+                self.trail.append(("cell", sentence, n, sentence.count))
+            sentence.mark_safe(n)
+
+    def neighbors(self, cell):
+        """
+        Returns the cells within one row and column of `cell`,
+        not including the cell itself, that are on the board.
+        A board with no height or width has no edges.
+        """
+        return self.index.neighbors(cell)
+
+    def unknown_cells(self):
+        """
+        Returns the cells not chosen and not known to be safe or mines.
+        On a board with no edges, only cells next to a chosen cell
+        are returned.
+        """
+        if self.height is None:
+            ids = set()
+            for n in self.move_ids:
+                ids.update(self.neighbor_ids(n))
+        elif self.index.ids is None:
+            ids = range(len(self.state))
+        else:
+            # Cells never numbered are unknown, so only the known
+            # ones need looking up
+            cells = self.index.cells
+            known = {cells[n] for n in self.safe_ids | self.mine_ids}
+            return {
+                cell for cell in itertools.product(
+                    range(self.height), range(self.width))
+                if cell not in known
+            }
+        return {self.index.cells[n] for n in ids if not self.state[n]}
+
+    def unknown_count(self):
+        """
+        Returns the number of cells not known to be safe or mines,
+        without listing them. Chosen cells are always known safe.
+        """
+        return self.height * self.width - len(self.safe_ids | self.mine_ids)
+
+    def constraints(self):
+        """
+        Returns the knowledge base as solver constraints over
+        (i, j) cells.
+        """
+        cells = self.index.cells
+        return [
+            (frozenset(cells[n] for n in group), count)
+            for group, count in solver.constraints(
+                self.knowledge, self.mine_ids, self.safe_ids
+            )
+        ]
 
     def add_knowledge(self, cell, count):
         """
@@ -195,51 +887,51 @@ class MinesweeperAI():
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
         """
-        self.moves_made.add(cell)
-        self.mark_safe(cell)
+        n = self.cell_id(cell)
+        state = self.state
+        if not state[n] & self.MOVE:
+            if self.checkpoints:
+                self.trail.append(("move", n))
+            state[n] |= self.MOVE
+            self.move_ids.add(n)
+        self.counts[n] = count
+        self.clock += 1
+        self.mark_safe_id(n)
         
 
-        clicked_cell = [cell]
         surrounding_cells = []
         
         #mark zero count as safes
         if count == 0:
-            for i in range(clicked_cell[0][0] - 1, clicked_cell[0][0] + 2):
-                for j in range(clicked_cell[0][1] - 1, clicked_cell[0][1] + 2):
-                    if (i, j) == clicked_cell[0]:
-                        continue
-                    if i == -1 or j == -1:
-                        continue
-                    if i >= self.height or j >= self.width:
-                        continue
-                    if (i,j) in self.safes:
-                        continue
-                    if (i,j) in self.mines:
-                        continue
-                    else:
-                        self.mark_safe((i,j))
-
-                        # self.surrounding_cells.add((i,j))
-                        # surrounding_cells.append((i,j))
+            for neighbor in self.neighbor_ids(n):
+                if state[neighbor] & (self.SAFE | self.MINE):
+                    continue
+                self.mark_safe_id(neighbor)
 
         #create sentence
-        for i in range(clicked_cell[0][0] - 1, clicked_cell[0][0] + 2):
-            for j in range(clicked_cell[0][1] - 1, clicked_cell[0][1] + 2):
-                if i == -1 or j == -1:
-                    continue
-                if (i, j) == clicked_cell[0]:
-                    continue
-                if i >= self.height or j >= self.width:
-                    continue
-                if (i,j) in self.safes:
-                    continue
-                # if (i,j) in self.mines:
-                #     continue
-                else:
-                    surrounding_cells.append((i,j))
+        for neighbor in self.neighbor_ids(n):
+            if not state[neighbor] & self.SAFE:
+                surrounding_cells.append(neighbor)
         
         #add sentence to the knowledge
-        self.knowledge.append(Sentence(surrounding_cells, count))
+        self.add_sentence(Sentence(surrounding_cells, count))
+
+        #look up local patterns, skipping general inference if one
+        #gives us a new safe move
+        if self.patterns:
+            safes, mines = pattern_library.match(self, cell)
+            new_safes = {
+                self.cell_id(safe) for safe in safes
+                if safe not in self.safes
+            }
+            for mine in mines:
+                if mine not in self.mines:
+                    self.mark_mine(mine)
+            for s in new_safes:
+                self.mark_safe_id(s)
+            if new_safes:
+                self.enforce_budget(cell)
+                return
         
         
         #finde safe cells
@@ -247,47 +939,162 @@ class MinesweeperAI():
         for i in self.knowledge:
             if i.known_safes() != None:
                 if len(i.known_safes()) != 0:
+                    self.touch(i)
                     for safe in i.known_safes():
                         safes.add(safe)
         for s in safes:
-            if s not in self.mines:
-                self.mark_safe(s)
+            if not state[s] & self.MINE:
+                self.mark_safe_id(s)
                 
         #find mine cells
         mines = set()
         for i in self.knowledge:
             if i.known_mines() != None:
                 if len(i.known_mines()) != 0:
+                    self.touch(i)
                     for mine in i.known_mines():
                         mines.add(mine)
         for m in mines:
-            if m not in self.safes:
-                self.mark_mine(m)
+            if not state[m] & self.SAFE:
+                self.mark_mine_id(m)
   
                         
-        #add new sentence base on inference    
-        copy_knwolede = copy.deepcopy(self.knowledge)
-      
-        new_sentence = None
-        new_count = None
-        
-        for sent1 in copy_knwolede:
-            # print(sent1.cells)
-            for sent2 in copy_knwolede:
-                if sent1.cells != sent2.cells:
-                    if len(sent1.cells) == 0 or len(sent2.cells) == 0:
-                        continue
-                    if sent1.cells.issubset(sent2.cells):    
-                        # print(f'cell = {cell} sent2 = {sent2.cells} - sent1 = {sent1.cells}')                                     
-                        new_sentence = sent2.cells - sent1.cells   
-                        new_count = sent2.count - sent1.count     
-                        # print(f'sent2 {sent2.cells} sent1 {sent1.cells}')
-                        
-        if new_sentence != None or new_count != None:  
-            # print(f'sent {new_sentence} coutn {new_count}')                        
-            self.knowledge.append(Sentence(new_sentence, new_count))
+        #add new sentence base on inference; the search only reads the
+        #knowledge, so it needs no copy. The last pair in order is the
+        #one used, so search from the back and stop at the first found
+        knowledge = self.knowledge
+        parents = None
+        for n1 in range(len(knowledge) - 1, -1, -1):
+            sent1 = knowledge[n1]
+            if not sent1.cells:
+                continue
+            for n2 in range(len(knowledge) - 1, -1, -1):
+                sent2 = knowledge[n2]
+                if (len(sent1.cells) < len(sent2.cells)
+                        and sent1.cells.issubset(sent2.cells)):
+                    parents = (n1, n2)
+                    break
+            if parents is not None:
+                break
+
+        if parents is not None:
+            sent1, sent2 = (knowledge[n] for n in parents)
+            for n in parents:
+                self.touch(knowledge[n])
+            self.add_sentence(Sentence(
+                sent2.cells - sent1.cells, sent2.count - sent1.count,
+                derived=True
+            ))
+
+        #with a process pool, solve the frontier exactly on it
+        if self.pool is not None and not self.checkpoints:
+            self.solve_frontier()
+
+        #settle what the total number of mines decides
+        self.solve_endgame()
+
+        #ask the SAT backend for anything else that is forced
+        self.solve_sat()
+
+        self.enforce_budget(cell)
             
             
+    def probabilities(self):
+        """
+        Returns the probability of each cell that is not known to be
+        safe or a mine, and has not been chosen, being a mine.
+        Exact once the total number of mines is known and few enough
+        cells are unknown.
+        """
+        constraint_list = self.constraints()
+        unknown = self.unknown_cells()
+        if self.total_mines is None or self.height is None or not unknown:
+            return solver.mine_probabilities(
+                constraint_list, unknown, cache=self.cache, pool=self.pool,
+                pool_cells=self.pool_cells
+            )
+
+        mines_left = self.total_mines - len(self.mine_ids)
+        if len(unknown) <= self.endgame_cells:
+            probabilities = solver.endgame_probabilities(
+                constraint_list, unknown, mines_left, cache=self.cache,
+                pool=self.pool, pool_cells=self.pool_cells
+            )
+            if probabilities is not None:
+                return probabilities
+        return solver.mine_probabilities(
+            constraint_list, unknown,
+            density=min(max(mines_left / len(unknown), 0), 1),
+            cache=self.cache, pool=self.pool, pool_cells=self.pool_cells
+        )
+
+    def solve_endgame(self):
+        """
+        Once few enough cells are unknown, marks every cell that the
+        total number of mines proves safe or a mine.
+        Returns the number of cells newly marked.
+        """
+        if self.total_mines is None or self.height is None:
+            return 0
+        if self.unknown_count() > self.endgame_cells:
+            return 0
+        marked = 0
+        for cell, probability in self.probabilities().items():
+            if probability == 0:
+                self.mark_safe(cell)
+                marked += 1
+            elif probability == 1:
+                self.mark_mine(cell)
+                marked += 1
+        return marked
+
+    def solve_frontier(self):
+        """
+        Solves every frontier component exactly, and marks each cell
+        that is safe, or a mine, in every consistent assignment.
+        Returns the number of cells newly marked.
+        """
+        marked = 0
+        groups = solver.components(self.constraints())
+        solutions = solver.solve_all(
+            groups, self.cache, self.pool, self.pool_cells
+        )
+        for solution in solutions:
+            if solution is None:
+                continue
+            safes, mines = solution.forced()
+            for cell in mines:
+                if cell not in self.mines:
+                    self.mark_mine(cell)
+                    marked += 1
+            for cell in safes:
+                if cell not in self.safes:
+                    self.mark_safe(cell)
+                    marked += 1
+        return marked
+
+    def solve_sat(self):
+        """
+        Marks every cell the SAT backend proves safe or a mine.
+        Hypothetical positions, inside a checkpoint, are not solved.
+        Returns the number of cells newly marked.
+        """
+        if self.sat is None or self.checkpoints:
+            return 0
+        ids = set()
+        for sentence in self.knowledge:
+            ids.update(sentence.cells)
+        ids = {
+            n for n in ids
+            if n in self.sat.variables and not self.state[n]
+        }
+        safes, mines = self.sat.forced(ids)
+        for n in mines:
+            self.mark_mine_id(n)
+        for n in safes:
+            self.mark_safe_id(n)
+        return len(safes) + len(mines)
+
     def make_safe_move(self):
         """
         Returns a safe cell to choose on the Minesweeper board.
@@ -298,13 +1105,10 @@ class MinesweeperAI():
         and self.moves_made, but should not modify any of those values.
         """
      
-        if self.safes:
-            for safe in self.safes:
-                if safe in self.mines:
-                    if safe not in self.moves_made:
-                        return safe
-                if safe not in self.moves_made:
-                    return safe
+        if self.safe_ids:
+            for safe in self.safe_ids:
+                if not self.state[safe] & self.MOVE:
+                    return self.index.cells[safe]
         else:
             return None
         
@@ -315,6 +1119,29 @@ class MinesweeperAI():
             1) have not already been chosen, and
             2) are not known to be mines
         """
+        if self.lookahead is not None and self.knowledge:
+            return self.lookahead.choose(self)
+
+        # Near the end, guess the cell least likely to be a mine
+        if (self.total_mines is not None and self.height is not None
+                and self.knowledge
+                and self.unknown_count() <= self.endgame_cells):
+            probabilities = self.probabilities()
+            if probabilities:
+                return min(probabilities, key=lambda cell: (
+                    probabilities[cell], cell
+                ))
+
+        # With no edges to enumerate, take the least likely mine
+        # next to the explored area
+        if self.height is None:
+            probabilities = self.probabilities()
+            if not probabilities:
+                return None if (0, 0) in self.moves_made else (0, 0)
+            return min(probabilities, key=lambda cell: (
+                probabilities[cell], cell
+            ))
+
         board = set()
         
         for i in range(self.height):
@@ -322,7 +1149,6 @@ class MinesweeperAI():
                 board.add((i,j))
 
         if not self.knowledge:
-             print(f'cells random not knolede {random.choice(tuple(board))}')
              return random.choice(tuple(board))
         else:
             for cells in board:
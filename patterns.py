@@ -0,0 +1,144 @@
+from cache import SYMMETRIES
+from solver import solve_component
+
+# Standard local patterns, drawn with the unknown cells on top.
+# '?' is an unknown cell, 'C' is any cell that is not unknown
+# (revealed, known safe, known mine or off the board), and a digit
+# is a revealed cell showing that many mines not yet known.
+PATTERNS = [
+    # 1-1 against a wall
+    ["C???",
+     "C11C",
+     "CCCC"],
+    # 1-2 against a wall
+    ["C???",
+     "C12C",
+     "CCCC"],
+    # 1-2-1
+    ["?????",
+     "C121C",
+     "CCCCC"],
+    # 1-2-2-1
+    ["??????",
+     "C1221C",
+     "CCCCCC"],
+]
+
+UNKNOWN = "?"
+CLOSED = "C"
+
+
+def deductions(pattern):
+    """
+    Returns the cells of a pattern that are safe, and that are mines,
+    in every assignment consistent with its numbers.
+    """
+    cells = {
+        (i, j): char
+        for i, row in enumerate(pattern)
+        for j, char in enumerate(row)
+    }
+    constraint_list = []
+    for (i, j), char in cells.items():
+        if not char.isdigit():
+            continue
+        unknown = set()
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                neighbor = (i + di, j + dj)
+                if neighbor == (i, j):
+                    continue
+                if neighbor not in cells:
+                    raise ValueError(f"pattern does not surround {(i, j)}")
+                if cells[neighbor] == UNKNOWN:
+                    unknown.add(neighbor)
+        constraint_list.append((frozenset(unknown), int(char)))
+    return cells, solve_component(constraint_list).forced()
+
+
+def build_tables():
+    """
+    Precomputes the lookup tables: for the number at the anchor, then
+    for every footprint (the shape of a pattern around one of its
+    numbers, in one orientation), a dict mapping the encoded window
+    to the (safes, mines) offsets it proves.
+    """
+    tables = {}
+    for pattern in PATTERNS:
+        cells, (safes, mines) = deductions(pattern)
+        anchors = [cell for cell, char in cells.items() if char.isdigit()]
+        for symmetry in SYMMETRIES:
+            for anchor in anchors:
+
+                def offset(cell):
+                    return symmetry(cell[0] - anchor[0], cell[1] - anchor[1])
+
+                ordered = sorted(cells, key=offset)
+                footprint = tuple(
+                    (offset(cell), cells[cell].isdigit()) for cell in ordered
+                )
+                key = tuple(
+                    int(cells[cell]) if cells[cell].isdigit() else cells[cell]
+                    for cell in ordered
+                )
+                number = int(cells[anchor])
+                footprints = tables.setdefault(number, {})
+                footprints.setdefault(footprint, {})[key] = (
+                    tuple(offset(cell) for cell in sorted(safes)),
+                    tuple(offset(cell) for cell in sorted(mines))
+                )
+    return tables
+
+
+TABLES = build_tables()
+
+
+def encode(ai, cell, as_number, numbers):
+    """
+    Returns the code of a cell as the AI sees it: UNKNOWN, CLOSED,
+    or for number positions its count less the known adjacent mines.
+    """
+    i, j = cell
+    if ai.height is not None and not (
+            0 <= i < ai.height and 0 <= j < ai.width):
+        return CLOSED
+    n = ai.index.find(cell)
+    if n is None or not ai.state[n]:
+        return UNKNOWN
+    if as_number and ai.state[n] & ai.MOVE:
+        if cell not in numbers:
+            mines = 0
+            for neighbor in ai.neighbor_ids(n):
+                if ai.state[neighbor] & ai.MINE:
+                    mines += 1
+            numbers[cell] = ai.counts[n] - mines
+        return numbers[cell]
+    return CLOSED
+
+
+def match(ai, cell):
+    """
+    Looks up every pattern around the revealed `cell`.
+    Returns the sets of cells proven safe, and proven mines.
+    """
+    safes = set()
+    mines = set()
+    codes = {}
+    numbers = {}
+    number = encode(ai, cell, True, numbers)
+    for footprint, table in TABLES.get(number, {}).items():
+        key = []
+        for (di, dj), as_number in footprint:
+            position = (cell[0] + di, cell[1] + dj)
+            if (position, as_number) not in codes:
+                codes[(position, as_number)] = encode(
+                    ai, position, as_number, numbers
+                )
+            key.append(codes[(position, as_number)])
+        result = table.get(tuple(key))
+        if result is not None:
+            for di, dj in result[0]:
+                safes.add((cell[0] + di, cell[1] + dj))
+            for di, dj in result[1]:
+                mines.add((cell[0] + di, cell[1] + dj))
+    return safes, mines
@@ -0,0 +1,206 @@
+import argparse
+import collections
+import cProfile
+import functools
+import json
+import os
+import random
+import signal
+import sys
+import time
+
+from minesweeper import Minesweeper, MinesweeperAI
+from tournament import play_game
+
+# Seeded workload: (height, width, mines, number of games)
+WORKLOAD = [
+    (8, 8, 10, 20),
+    (16, 16, 40, 5),
+    (16, 30, 99, 2),
+]
+
+# MinesweeperAI methods timed by the gate
+HOT_PATHS = [
+    "add_knowledge",
+    "mark_mine_id",
+    "mark_safe_id",
+    "make_safe_move",
+    "make_random_move",
+]
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "perf_baseline.json")
+
+
+def run_workload():
+    """
+    Plays every game in the workload with a fresh MinesweeperAI.
+    """
+    for height, width, mines, games in WORKLOAD:
+        for seed in range(games):
+            random.seed(seed)
+            game = Minesweeper(height=height, width=width, mines=mines,
+                               seed=seed)
+            play_game(MinesweeperAI(height=height, width=width), game)
+
+
+def time_hot_paths():
+    """
+    Runs the workload with every hot path wrapped in a timer.
+    Returns {method: {"calls": n, "seconds": total}}, where time
+    spent in a nested timed call counts towards both methods.
+    """
+    timings = {name: {"calls": 0, "seconds": 0.0} for name in HOT_PATHS}
+    originals = {name: getattr(MinesweeperAI, name) for name in HOT_PATHS}
+
+    def timed(name, method):
+        entry = timings[name]
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                entry["calls"] += 1
+                entry["seconds"] += time.perf_counter() - start
+        return wrapper
+
+    for name, method in originals.items():
+        setattr(MinesweeperAI, name, timed(name, method))
+    try:
+        run_workload()
+    finally:
+        for name, method in originals.items():
+            setattr(MinesweeperAI, name, method)
+    return timings
+
+
+def measure(repeat):
+    """
+    Times the workload `repeat` times, keeping each method's fastest run.
+    """
+    best = None
+    for _ in range(repeat):
+        timings = time_hot_paths()
+        if best is None:
+            best = timings
+        else:
+            for name, entry in timings.items():
+                if entry["seconds"] < best[name]["seconds"]:
+                    best[name] = entry
+    return best
+
+
+def compare(baseline, current, threshold, noise=0.005):
+    """
+    Returns report lines for every hot path, and whether any of them
+    got slower than the baseline by more than `threshold`. Changes
+    smaller than `noise` seconds are never counted as regressions.
+    """
+    lines = [f"{'method':<20}{'baseline s':>12}{'current s':>12}"
+             f"{'change':>10}{'calls':>16}"]
+    regressed = False
+    for name in HOT_PATHS:
+        old = baseline.get(name)
+        new = current[name]
+        if old is None:
+            lines.append(f"{name:<20}{'-':>12}{new['seconds']:>12.4f}"
+                         f"{'new':>10}{new['calls']:>16}")
+            continue
+        change = new["seconds"] / old["seconds"] - 1 if old["seconds"] else 0
+        flag = ""
+        if change > threshold and new["seconds"] - old["seconds"] > noise:
+            regressed = True
+            flag = "  REGRESSED"
+        calls = str(new["calls"])
+        if new["calls"] != old["calls"]:
+            calls = f"{old['calls']}->{new['calls']}"
+        lines.append(f"{name:<20}{old['seconds']:>12.4f}"
+                     f"{new['seconds']:>12.4f}{change:>+10.1%}"
+                     f"{calls:>16}{flag}")
+    return lines, regressed
+
+
+def profile(path):
+    """
+    Runs the workload under cProfile and saves the stats to `path`.
+    """
+    profiler = cProfile.Profile()
+    profiler.runcall(run_workload)
+    profiler.dump_stats(path)
+
+
+def sample_stacks(path, interval=0.001):
+    """
+    Runs the workload while sampling the Python stack on a CPU timer,
+    and writes the samples as collapsed stacks ("a;b;c count" lines)
+    that flame-graph tools read directly.
+    """
+    counts = collections.Counter()
+
+    def sample(signum, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        counts[";".join(reversed(stack))] += 1
+
+    previous = signal.signal(signal.SIGPROF, sample)
+    signal.setitimer(signal.ITIMER_PROF, interval, interval)
+    try:
+        run_workload()
+    finally:
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, previous)
+
+    with open(path, "w") as f:
+        for stack, count in sorted(counts.items()):
+            f.write(f"{stack} {count}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check MinesweeperAI hot paths against stored baselines."
+    )
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown, as a fraction")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="perf-output",
+                        help="directory for profiles and collapsed stacks")
+    parser.add_argument("--update", action="store_true",
+                        help="store this run as the new baseline")
+    args = parser.parse_args()
+
+    current = measure(args.repeat)
+
+    os.makedirs(args.output, exist_ok=True)
+    profile(os.path.join(args.output, "perf.prof"))
+    if hasattr(signal, "setitimer"):
+        sample_stacks(os.path.join(args.output, "perf.collapsed"))
+    print(f"Profiles written to {args.output}/")
+
+    if args.update or not os.path.exists(args.baseline):
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    lines, regressed = compare(baseline, current, args.threshold)
+    print("\n".join(lines))
+    if any(baseline.get(name, {}).get("calls") != current[name]["calls"]
+           for name in HOT_PATHS):
+        print("Call counts differ from the baseline; if the workload or "
+              "the code paths changed, rerun with --update.")
+    if regressed:
+        print(f"Hot paths regressed by more than {args.threshold:.0%}.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
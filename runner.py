@@ -41,11 +41,6 @@ mine = pygame.transform.scale(mine, (cell_size, cell_size))
 game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
 ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
 
-# Keep track of revealed cells, flagged cells, and if a mine was hit
-revealed = set()
-flags = set()
-lost = False
-
 # Show instructions initially
 instructions = True
 
@@ -114,12 +109,12 @@ while True:
             pygame.draw.rect(screen, WHITE, rect, 3)
 
             # Add a mine, flag, or number if needed
-            if game.is_mine((i, j)) and lost:
+            if game.is_mine((i, j)) and game.lost:
                 
                 screen.blit(mine, rect)
-            elif (i, j) in flags:
+            elif (i, j) in game.flags:
                 screen.blit(flag, rect)
-            elif (i, j) in revealed:
+            elif (i, j) in game.revealed:
                 neighbors = smallFont.render(
                     str(game.nearby_mines((i, j))),
                     True, BLACK
@@ -154,7 +149,7 @@ while True:
     screen.blit(buttonText, buttonRect)
 
     # Display text
-    text = "Lost" if lost else "Won" if game.mines == flags else ""
+    text = "Lost" if game.lost else "Won" if game.won() else ""
     text = mediumFont.render(text, True, WHITE)
     textRect = text.get_rect()
     textRect.center = ((5 / 6) * width, (2 / 3) * height)
@@ -165,27 +160,26 @@ while True:
     left, _, right = pygame.mouse.get_pressed()
 
     # Check for a right-click to toggle flagging
-    if right == 1 and not lost:
+    if right == 1 and not game.lost:
         mouse = pygame.mouse.get_pos()
         for i in range(HEIGHT):
             for j in range(WIDTH):
-                if cells[i][j].collidepoint(mouse) and (i, j) not in revealed:
-                    if (i, j) in flags:
-                        flags.remove((i, j))
-                    else:
-                        flags.add((i, j))
+                if (cells[i][j].collidepoint(mouse)
+                        and (i, j) not in game.revealed):
+                    game.flag((i, j))
                     time.sleep(0.2)
 
     elif left == 1:
         mouse = pygame.mouse.get_pos()
 
         # If AI button clicked, make an AI move
-        if aiButton.collidepoint(mouse) and not lost:
+        if aiButton.collidepoint(mouse) and not game.lost:
             move = ai.make_safe_move()
             if move is None:
                 move = ai.make_random_move()
                 if move is None:
-                    flags = ai.mines.copy()
+                    for cell in ai.mines - game.flags:
+                        game.flag(cell)
                     print("No moves left to make.")
                 else:
                     print("No known safe moves, AI making random move.")
@@ -197,27 +191,21 @@ while True:
         elif resetButton.collidepoint(mouse):
             game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
             ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
-            revealed = set()
-            flags = set()
-            lost = False
             continue
 
         # User-made move
-        elif not lost:
+        elif not game.lost:
             for i in range(HEIGHT):
                 for j in range(WIDTH):
                     if (cells[i][j].collidepoint(mouse)
-                            and (i, j) not in flags
-                            and (i, j) not in revealed):
+                            and (i, j) not in game.flags
+                            and (i, j) not in game.revealed):
                         move = (i, j)
 
     # Make move and update AI knowledge
     if move:
-        if game.is_mine(move):
-            lost = True
-        else:
-            nearby = game.nearby_mines(move)
-            revealed.add(move)
+        nearby = game.reveal(move)
+        if nearby is not None:
             ai.add_knowledge(move, nearby)
         
     pygame.display.flip()
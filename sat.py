@@ -0,0 +1,396 @@
+import itertools
+
+# Direct encodings with more clauses than this use a sequential counter
+MAX_DIRECT_CLAUSES = 64
+
+
+class Solver():
+    """
+    Incremental CDCL SAT solver: two watched literals per clause,
+    first-UIP clause learning, activity-based branching and restarts.
+    Variables are positive ints, literals are +v or -v.
+    Learned clauses are kept between calls to solve().
+    """
+
+    def __init__(self):
+        self.variables = 0
+        self.clauses = []
+        self.watches = {}
+
+        # Per-variable value (True, False or None), decision level,
+        # reason clause and branching activity
+        self.value = [None]
+        self.level = [0]
+        self.reason = [None]
+        self.activity = [0.0]
+        self.bump = 1.0
+
+        # Assigned literals in order, and where each level starts
+        self.trail = []
+        self.limits = []
+        self.head = 0
+
+        # False once the clauses are unsatisfiable on their own
+        self.ok = True
+        self.conflicts = 0
+
+        # Values of every variable in the last satisfying assignment
+        self.model = None
+
+    def new_variable(self):
+        """
+        Returns a fresh variable.
+        """
+        self.variables += 1
+        self.value.append(None)
+        self.level.append(0)
+        self.reason.append(None)
+        self.activity.append(0.0)
+        self.watches[self.variables] = []
+        self.watches[-self.variables] = []
+        return self.variables
+
+    def literal_value(self, literal):
+        """
+        Returns True, False or None for a literal.
+        """
+        value = self.value[abs(literal)]
+        if value is None or literal > 0:
+            return value
+        return not value
+
+    def assign(self, literal, reason):
+        """
+        Makes a literal true at the current decision level.
+        """
+        variable = abs(literal)
+        self.value[variable] = literal > 0
+        self.level[variable] = len(self.limits)
+        self.reason[variable] = reason
+        self.trail.append(literal)
+
+    def add_clause(self, literals):
+        """
+        Adds a clause, between calls to solve(). Returns False if the
+        clauses are now known to be unsatisfiable.
+        """
+        if not self.ok:
+            return False
+        literals = list(dict.fromkeys(literals))
+        if any(-literal in literals for literal in literals):
+            return True
+        if any(self.literal_value(literal) for literal in literals):
+            return True
+        literals = [
+            literal for literal in literals
+            if self.literal_value(literal) is None
+        ]
+        if not literals:
+            self.ok = False
+            return False
+        if len(literals) == 1:
+            if self.literal_value(literals[0]) is None:
+                self.assign(literals[0], None)
+            if self.propagate() is not None:
+                self.ok = False
+            return self.ok
+        index = len(self.clauses)
+        self.clauses.append(literals)
+        self.watches[-literals[0]].append(index)
+        self.watches[-literals[1]].append(index)
+        return True
+
+    def propagate(self):
+        """
+        Assigns every literal forced by unit clauses.
+        Returns the index of a conflicting clause, or None.
+        """
+        while self.head < len(self.trail):
+            literal = self.trail[self.head]
+            self.head += 1
+            watching = self.watches[literal]
+            kept = []
+            conflict = None
+            for index in watching:
+                if conflict is not None:
+                    kept.append(index)
+                    continue
+                clause = self.clauses[index]
+
+                # Keep the false literal in the second slot
+                if clause[0] == -literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.literal_value(clause[0]) is True:
+                    kept.append(index)
+                    continue
+
+                # Look for another literal to watch
+                for k in range(2, len(clause)):
+                    if self.literal_value(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches[-clause[1]].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if self.literal_value(clause[0]) is False:
+                        conflict = index
+                        self.head = len(self.trail)
+                    else:
+                        self.assign(clause[0], index)
+            self.watches[literal] = kept
+            if conflict is not None:
+                return conflict
+        return None
+
+    def analyze(self, conflict):
+        """
+        Derives the first-UIP clause from a conflict.
+        Returns the learned clause, asserting literal first,
+        and the level to jump back to.
+        """
+        learned = [None]
+        seen = set()
+        pending = 0
+        literal = None
+        index = len(self.trail) - 1
+        clause = self.clauses[conflict]
+        current = len(self.limits)
+        while True:
+            for other in clause:
+                if literal is not None and other == literal:
+                    continue
+                variable = abs(other)
+                if variable in seen or self.level[variable] == 0:
+                    continue
+                seen.add(variable)
+                self.activity[variable] += self.bump
+                if self.level[variable] == current:
+                    pending += 1
+                else:
+                    learned.append(other)
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.clauses[self.reason[abs(literal)]]
+        learned[0] = -literal
+        self.bump *= 1.05
+
+        level = 0
+        for n in range(1, len(learned)):
+            if self.level[abs(learned[n])] > level:
+                level = self.level[abs(learned[n])]
+                learned[1], learned[n] = learned[n], learned[1]
+        return learned, level
+
+    def backtrack(self, level):
+        """
+        Undoes every assignment above `level`.
+        """
+        if len(self.limits) <= level:
+            return
+        start = self.limits[level]
+        for literal in self.trail[start:]:
+            self.value[abs(literal)] = None
+            self.reason[abs(literal)] = None
+        del self.trail[start:]
+        del self.limits[level:]
+        self.head = len(self.trail)
+
+    def decide(self):
+        """
+        Returns the unassigned variable with the highest activity,
+        or None if every variable is assigned.
+        """
+        best = None
+        for variable in range(1, self.variables + 1):
+            if self.value[variable] is None and (
+                    best is None
+                    or self.activity[variable] > self.activity[best]):
+                best = variable
+        return best
+
+    def solve(self, assumptions=()):
+        """
+        Returns True, with a model in self.model, if the clauses can
+        all be satisfied with every assumption literal true.
+        """
+        self.model = None
+        if not self.ok:
+            return False
+        if self.propagate() is not None:
+            self.ok = False
+            return False
+
+        restart = 100
+        conflicts = 0
+        try:
+            while True:
+                conflict = self.propagate()
+                if conflict is not None:
+                    self.conflicts += 1
+                    conflicts += 1
+                    if not self.limits:
+                        self.ok = False
+                        return False
+                    learned, level = self.analyze(conflict)
+                    self.backtrack(level)
+                    if len(learned) == 1:
+                        self.backtrack(0)
+                        if self.literal_value(learned[0]) is False:
+                            self.ok = False
+                            return False
+                        if self.literal_value(learned[0]) is None:
+                            self.assign(learned[0], None)
+                    else:
+                        index = len(self.clauses)
+                        self.clauses.append(learned)
+                        self.watches[-learned[0]].append(index)
+                        self.watches[-learned[1]].append(index)
+                        self.assign(learned[0], index)
+                    continue
+
+                if conflicts >= restart:
+                    conflicts = 0
+                    restart = int(restart * 1.5)
+                    self.backtrack(0)
+                    continue
+
+                # Decide the assumptions first, one level each
+                literal = None
+                while len(self.limits) < len(assumptions):
+                    assumption = assumptions[len(self.limits)]
+                    value = self.literal_value(assumption)
+                    if value is False:
+                        return False
+                    self.limits.append(len(self.trail))
+                    if value is None:
+                        literal = assumption
+                        break
+                if literal is None:
+                    variable = self.decide()
+                    if variable is None:
+                        self.model = self.value[:]
+                        return True
+                    literal = -variable
+                    self.limits.append(len(self.trail))
+                self.assign(literal, None)
+        finally:
+            self.backtrack(0)
+
+
+def at_most(solver, literals, k):
+    """
+    Adds clauses saying at most k of the literals are true.
+    """
+    n = len(literals)
+    if k >= n:
+        return
+    if k < 0:
+        solver.add_clause([])
+        return
+    if k == 0:
+        for literal in literals:
+            solver.add_clause([-literal])
+        return
+
+    # Small constraints list every forbidden combination directly
+    combinations = 1
+    for m in range(k + 1):
+        combinations = combinations * (n - m) // (m + 1)
+    if combinations <= MAX_DIRECT_CLAUSES:
+        for subset in itertools.combinations(literals, k + 1):
+            solver.add_clause([-literal for literal in subset])
+        return
+
+    # Larger ones use a sequential counter: s[i][j] means at least
+    # j + 1 of the first i + 1 literals are true
+    s = [[solver.new_variable() for _ in range(k)] for _ in range(n - 1)]
+    solver.add_clause([-literals[0], s[0][0]])
+    for j in range(1, k):
+        solver.add_clause([-s[0][j]])
+    for i in range(1, n - 1):
+        solver.add_clause([-literals[i], s[i][0]])
+        solver.add_clause([-s[i - 1][0], s[i][0]])
+        for j in range(1, k):
+            solver.add_clause([-literals[i], -s[i - 1][j - 1], s[i][j]])
+            solver.add_clause([-s[i - 1][j], s[i][j]])
+        solver.add_clause([-literals[i], -s[i - 1][k - 1]])
+    solver.add_clause([-literals[n - 1], -s[n - 2][k - 1]])
+
+
+def exactly(solver, literals, k):
+    """
+    Adds clauses saying exactly k of the literals are true.
+    """
+    at_most(solver, literals, k)
+    at_most(solver, [-literal for literal in literals], len(literals) - k)
+
+
+class SatBackend():
+    """
+    Inference backend that encodes sentences as cardinality
+    constraints over one variable per cell, and decides which cells
+    are forced by asking the SAT solver whether each can be a mine.
+    """
+
+    def __init__(self):
+        self.solver = Solver()
+        self.variables = {}
+
+    def variable(self, cell):
+        """
+        Returns the solver variable for a cell, creating it if new.
+        """
+        if cell not in self.variables:
+            self.variables[cell] = self.solver.new_variable()
+        return self.variables[cell]
+
+    def add_sentence(self, cells, count):
+        """
+        Adds the constraint that exactly `count` of `cells` are mines.
+        """
+        exactly(self.solver, [self.variable(cell) for cell in cells], count)
+
+    def add_fact(self, cell, mine):
+        """
+        Adds the fact that a cell is, or is not, a mine.
+        """
+        variable = self.variable(cell)
+        self.solver.add_clause([variable if mine else -variable])
+
+    def forced(self, cells):
+        """
+        Returns the sets of `cells` that are safe, and that are mines,
+        in every assignment satisfying the constraints.
+        """
+        safes = set()
+        mines = set()
+        if not self.solver.solve():
+            return safes, mines
+
+        # Every model shows values each cell can take, so only the
+        # values no model has shown yet need a query
+        seen = {}
+
+        def witness(model):
+            for cell in cells:
+                variable = self.variables[cell]
+                seen.setdefault(cell, set()).add(model[variable])
+
+        witness(self.solver.model)
+        for cell in cells:
+            variable = self.variables[cell]
+            for mine in (True, False):
+                if mine in seen[cell]:
+                    continue
+                if self.solver.solve([variable if mine else -variable]):
+                    witness(self.solver.model)
+                elif mine:
+                    safes.add(cell)
+                else:
+                    mines.add(cell)
+        return safes, mines
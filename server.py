@@ -0,0 +1,205 @@
+import argparse
+import asyncio
+import concurrent.futures
+import itertools
+import json
+import multiprocessing
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+# Largest board a client may ask for
+MAX_CELLS = 1 << 20
+
+
+def integer(request, key, default):
+    """
+    Returns an integer field of a request, or its default.
+    """
+    value = request.get(key, default)
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise ValueError(f"{key} must be an integer")
+    return value
+
+
+def board_cell(request, game):
+    """
+    Returns the cell named by a request, checking it is on the board.
+    """
+    cell = request["cell"]
+    if (not isinstance(cell, list) or len(cell) != 2
+            or not all(isinstance(n, int) and not isinstance(n, bool)
+                       for n in cell)):
+        raise ValueError("cell must be a list of two integers")
+    i, j = cell
+    if not (0 <= i < game.height and 0 <= j < game.width):
+        raise ValueError(f"cell {cell} is off the board")
+    return (i, j)
+
+
+def hint(height, width, observations):
+    """
+    Rebuilds an AI from (i, j, count) observations and returns its
+    next move and whether it is known to be safe. Runs in a worker
+    process, so it only takes and returns plain data.
+    """
+    ai = MinesweeperAI.from_snapshot(
+        {(i, j): count for i, j, count in observations},
+        height=height, width=width
+    )
+    move = ai.make_safe_move()
+    if move is not None:
+        return list(move), True
+    move = ai.make_random_move()
+    return (None if move is None else list(move)), False
+
+
+class Session():
+    """
+    One game hosted by the server, and what its player has seen.
+    """
+
+    def __init__(self, game):
+        self.game = game
+        self.observations = []
+
+
+class GameServer():
+    """
+    Hosts Minesweeper sessions over TCP, one JSON object per line
+    each way. Hints are computed on a process pool so that AI
+    inference never blocks the event loop.
+    """
+
+    def __init__(self, workers=None):
+        self.sessions = {}
+        self.ids = itertools.count(1)
+
+        # Workers start from a fork server, so they never inherit the
+        # sockets of open connections and keep them from closing
+        self.pool = concurrent.futures.ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("forkserver")
+        )
+
+    async def handle(self, reader, writer):
+        """
+        Serves one connection, answering requests in order. The
+        sessions the connection opened are closed when it ends.
+        """
+        owned = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = {}
+                try:
+                    request = json.loads(line)
+                    response = await self.dispatch(request, owned)
+                except (ValueError, KeyError, TypeError) as e:
+                    response = {"error": str(e)}
+                if isinstance(request, dict) and "id" in request:
+                    response["id"] = request["id"]
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for session in owned:
+                self.sessions.pop(session, None)
+            writer.close()
+
+    async def dispatch(self, request, owned=None):
+        """
+        Carries out one request and returns the response. New
+        sessions are added to `owned`, if given, and closed ones
+        removed from it.
+        """
+        op = request["op"]
+        if op == "new":
+            height = integer(request, "height", 8)
+            width = integer(request, "width", 8)
+            mines = integer(request, "mines", 8)
+            if not (height > 0 and width > 0
+                    and height * width <= MAX_CELLS):
+                raise ValueError(
+                    f"board must have between 1 and {MAX_CELLS} cells"
+                )
+            if not 0 <= mines < height * width:
+                raise ValueError(
+                    "mines must be at least 0 and fewer than the cells"
+                )
+            game = Minesweeper(
+                height=height, width=width, mines=mines,
+                seed=request.get("seed")
+            )
+            session = next(self.ids)
+            self.sessions[session] = Session(game)
+            if owned is not None:
+                owned.add(session)
+            return {"session": session}
+
+        key = request.get("session")
+        session = self.sessions.get(key) if isinstance(key, int) else None
+        if session is None:
+            raise ValueError(f"unknown session {key!r}")
+        game = session.game
+        if op in ("reveal", "flag") and game.over():
+            raise ValueError(f"session {key} is over")
+        if op == "reveal":
+            cell = board_cell(request, game)
+            count = game.reveal(cell)
+            if count is not None:
+                session.observations.append((cell[0], cell[1], count))
+            return {"count": count, "lost": game.lost, "won": game.won()}
+        if op == "flag":
+            cell = board_cell(request, game)
+            game.flag(cell)
+            return {"flagged": cell in game.flags, "won": game.won()}
+        if op == "hint":
+            move, safe = await asyncio.get_running_loop().run_in_executor(
+                self.pool, hint, game.height, game.width,
+                list(session.observations)
+            )
+            return {"cell": move, "safe": safe}
+        if op == "close":
+            del self.sessions[key]
+            if owned is not None:
+                owned.discard(key)
+            return {"closed": True}
+        raise ValueError(f"unknown op {op!r}")
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        """
+        Accepts connections until cancelled.
+        """
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        """
+        Shuts down the worker pool.
+        """
+        self.pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Host Minesweeper games over JSON lines on TCP."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    server = GameServer(workers=args.workers)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+import argparse
+import multiprocessing
+import time
+
+from minesweeper import MinesweeperAI, Sentence
+from sharedboard import SharedMinesweeper
+
+# Seconds to wait for a worker to stop before terminating it
+JOIN_TIMEOUT = 5
+
+
+def split(height, width, rows, cols):
+    """
+    Returns (top, left, bottom, right) rectangles tiling the board
+    in `rows` x `cols` shards, bottom and right exclusive.
+    """
+    return [
+        (height * r // rows, width * c // cols,
+         height * (r + 1) // rows, width * (c + 1) // cols)
+        for r in range(rows)
+        for c in range(cols)
+    ]
+
+
+def grow(region, margin, height, width):
+    """
+    Returns a region widened by `margin` cells on every side,
+    clipped to the board.
+    """
+    top, left, bottom, right = region
+    return (max(top - margin, 0), max(left - margin, 0),
+            min(bottom + margin, height), min(right + margin, width))
+
+
+def inside(cell, region):
+    """
+    Checks if a cell lies in a region.
+    """
+    top, left, bottom, right = region
+    return top <= cell[0] < bottom and left <= cell[1] < right
+
+
+class Shard():
+    """
+    One rectangular region of a shared board, played by its own
+    MinesweeperAI. The AI sees a window two cells wider than the
+    region, in window coordinates, so that every sentence about a
+    cell next to the region fits in it.
+    """
+
+    def __init__(self, board, region):
+        self.board = board
+        self.region = region
+        self.window = grow(region, 2, board.height, board.width)
+        top, left, bottom, right = self.window
+
+        # Pattern tables would take the window's edges for walls
+        self.ai = MinesweeperAI(
+            height=bottom - top, width=right - left, patterns=False
+        )
+
+        # Facts already sent to the coordinator
+        self.reported = set()
+
+    def local(self, cell):
+        return (cell[0] - self.window[0], cell[1] - self.window[1])
+
+    def world(self, cell):
+        return (cell[0] + self.window[0], cell[1] + self.window[1])
+
+    def on_edge(self, cell, margin):
+        """
+        Checks if a cell of the region is within `margin` cells of
+        its edge, where other shards can see it.
+        """
+        inner = grow(self.region, -margin, self.board.height,
+                     self.board.width)
+        return not inside(cell, inner)
+
+    def absorb(self, observations, mines, safes, sentences):
+        """
+        Adds boundary facts, revealed counts and derived sentences
+        from other shards.
+        """
+        ai = self.ai
+        for cell in mines:
+            ai.mark_mine(self.local(cell))
+        for cell in safes:
+            ai.mark_safe(self.local(cell))
+        for cell, count in observations:
+            if self.local(cell) not in ai.moves_made:
+                ai.add_knowledge(self.local(cell), count)
+
+        # Sentences arrive over the cells they had when sent, so drop
+        # the ones known since; none is sent back
+        for cells, count in sentences:
+            self.reported.add(("sentence", tuple(cells), count))
+            ids = []
+            for cell in cells:
+                n = ai.cell_id(self.local(cell))
+                if ai.state[n] & ai.MINE:
+                    count -= 1
+                elif not ai.state[n] & ai.SAFE:
+                    ids.append(n)
+            sentence = Sentence(ids, count, derived=True)
+            if ids and sentence not in ai.knowledge:
+                ai.add_sentence(sentence)
+
+    def next_safe(self):
+        """
+        Returns a cell of the region known to be safe and not yet
+        revealed, or None.
+        """
+        for cell in self.ai.safes:
+            if cell not in self.ai.moves_made and inside(
+                    self.world(cell), self.region):
+                return cell
+        return None
+
+    def guess(self):
+        """
+        Returns the cell of the region least likely to be a mine,
+        or None if every cell of the region is known.
+        """
+        probabilities = self.ai.probabilities()
+        cells = [
+            cell for cell in probabilities
+            if inside(self.world(cell), self.region)
+        ]
+        if not cells:
+            return None
+        return min(cells, key=lambda cell: (probabilities[cell], cell))
+
+    def play(self, guess):
+        """
+        Reveals every cell of the region that can be proven safe,
+        after one guess if `guess` is set and nothing is proven.
+        Returns the counts revealed near the edge, the new mine and
+        safe facts and derived sentences near the edge, whether a mine
+        was hit, and the number of cells revealed.
+        """
+        observations = []
+        revealed = 0
+        lost = False
+        while True:
+            move = self.next_safe()
+            if move is None and self.ai.solve_frontier():
+                move = self.next_safe()
+            if move is None and guess and not revealed:
+                move = self.guess()
+            if move is None:
+                break
+            count = self.board.reveal(self.world(move))
+            if count is None:
+                lost = True
+                break
+            self.ai.add_knowledge(move, count)
+            revealed += 1
+            if self.on_edge(self.world(move), 1):
+                observations.append((self.world(move), count))
+
+        mines = self.news(self.ai.mines, "mine")
+        safes = self.news(self.ai.safes, "safe")
+        return observations, mines, safes, self.sentences(), lost, revealed
+
+    def news(self, cells, kind):
+        """
+        Returns the cells, in board coordinates, that other shards
+        can see and have not been told about yet.
+        """
+        news = []
+        for cell in cells:
+            cell = self.world(cell)
+            if (kind, cell) in self.reported:
+                continue
+            if inside(cell, self.region) and not self.on_edge(cell, 2):
+                continue
+            self.reported.add((kind, cell))
+            news.append(cell)
+        return news
+
+    def sentences(self):
+        """
+        Returns the derived sentences, as (cells, count) in board
+        coordinates, that mention a cell other shards can see and
+        have not been sent yet. Sentences from revealed counts are
+        not sent; the counts themselves are.
+        """
+        cells = self.ai.index.cells
+        news = []
+        for sentence in self.ai.knowledge:
+            if not sentence.derived or not sentence.cells:
+                continue
+            world = tuple(sorted(
+                self.world(cells[n]) for n in sentence.cells
+            ))
+            if ("sentence", world, sentence.count) in self.reported:
+                continue
+            if all(inside(cell, self.region) and not self.on_edge(cell, 2)
+                   for cell in world):
+                continue
+            self.reported.add(("sentence", world, sentence.count))
+            news.append((world, sentence.count))
+        return news
+
+    def unknown(self):
+        """
+        Returns the number of cells of the region not yet revealed
+        or known to be mines.
+        """
+        top, left, bottom, right = self.region
+        return (bottom - top) * (right - left) - sum(
+            1 for cell in self.ai.moves_made
+            if inside(self.world(cell), self.region)
+        ) - sum(
+            1 for cell in self.ai.mines
+            if inside(self.world(cell), self.region)
+        )
+
+
+def shard_worker(board, region, connection):
+    """
+    Plays one shard, one round per message from the coordinator,
+    until it sends None.
+    """
+    shard = Shard(board, region)
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        observations, mines, safes, sentences, guess = message
+        shard.absorb(observations, mines, safes, sentences)
+        result = shard.play(guess)
+        connection.send(result + (shard.unknown(),))
+    connection.close()
+    board.close()
+
+
+class ShardedGame():
+    """
+    Plays one shared board with a worker process per rectangular
+    shard. Between rounds, the coordinator forwards the counts,
+    facts and derived sentences each shard found near its edge to the
+    shards that can see those cells, so deductions across shard
+    borders still happen.
+    When no shard can make progress, one shard guesses.
+    """
+
+    def __init__(self, board, rows=2, cols=2):
+        self.board = board
+        self.regions = split(board.height, board.width, rows, cols)
+        self.windows = [
+            grow(region, 2, board.height, board.width)
+            for region in self.regions
+        ]
+        self.rounds = 0
+        self.guesses = 0
+
+    def route(self, sender, observations, mines, safes, sentences,
+              inboxes):
+        """
+        Adds a shard's findings to the inboxes of the other shards
+        that can see them. A sentence goes to the shards whose
+        windows hold all of its cells.
+        """
+        for n, region in enumerate(self.regions):
+            if n == sender:
+                continue
+            seen = grow(region, 1, self.board.height, self.board.width)
+            inbox = inboxes[n]
+            inbox[0].extend(
+                (cell, count) for cell, count in observations
+                if inside(cell, seen)
+            )
+            inbox[1].extend(
+                cell for cell in mines if inside(cell, self.windows[n])
+            )
+            inbox[2].extend(
+                cell for cell in safes if inside(cell, self.windows[n])
+            )
+            inbox[3].extend(
+                (cells, count) for cells, count in sentences
+                if all(inside(cell, self.windows[n]) for cell in cells)
+            )
+
+    def run(self):
+        """
+        Plays until the board is won, a mine is hit, or every shard
+        is stuck. Returns whether the board was won.
+        """
+        connections = []
+        workers = []
+        for region in self.regions:
+            parent, child = multiprocessing.Pipe()
+            worker = multiprocessing.Process(
+                target=shard_worker, args=(self.board, region, child)
+            )
+            worker.start()
+            child.close()
+            connections.append(parent)
+            workers.append(worker)
+
+        inboxes = [([], [], [], []) for _ in self.regions]
+        unknown = [1] * len(self.regions)
+        guesser = 0
+        guess = True
+        lost = False
+        try:
+            while not lost and not self.board.won():
+                self.rounds += 1
+                for n, connection in enumerate(connections):
+                    connection.send(inboxes[n] + (guess and n == guesser,))
+                if guess:
+                    self.guesses += 1
+                inboxes = [([], [], [], []) for _ in self.regions]
+
+                progress = False
+                for n, connection in enumerate(connections):
+                    (observations, mines, safes, sentences, hit, revealed,
+                     left) = connection.recv()
+                    lost = lost or hit
+                    unknown[n] = left
+                    progress = (progress or revealed > 0 or mines or safes
+                                or sentences)
+                    self.route(n, observations, mines, safes, sentences,
+                               inboxes)
+
+                # With nothing new anywhere, the next shard with
+                # unknown cells has to guess
+                guess = not progress
+                if guess:
+                    candidates = [
+                        n for n in range(len(self.regions)) if unknown[n]
+                    ]
+                    if not candidates:
+                        break
+                    guesser = min(
+                        candidates,
+                        key=lambda n: (n - guesser - 1) % len(self.regions)
+                    )
+        finally:
+
+            # A worker that died has closed its end, so sending to it
+            # fails; the others must still be stopped
+            for connection in connections:
+                try:
+                    connection.send(None)
+                except OSError:
+                    pass
+                connection.close()
+            for worker in workers:
+                worker.join(JOIN_TIMEOUT)
+                if worker.is_alive():
+                    worker.terminate()
+                    worker.join()
+        return not lost and self.board.won()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play one large board with a worker per shard."
+    )
+    parser.add_argument("--height", type=int, default=32)
+    parser.add_argument("--width", type=int, default=32)
+    parser.add_argument("--mines", type=int, default=160)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rows", type=int, default=2)
+    parser.add_argument("--cols", type=int, default=2)
+    args = parser.parse_args()
+
+    board = SharedMinesweeper.create(
+        args.height, args.width, args.mines, seed=args.seed
+    )
+    try:
+        game = ShardedGame(board, rows=args.rows, cols=args.cols)
+        start = time.perf_counter()
+        won = game.run()
+        print(f"{'Won' if won else 'Lost'} in {game.rounds} rounds with "
+              f"{game.guesses} guesses, {board.revealed_count()} cells "
+              f"revealed, {time.perf_counter() - start:.2f}s")
+    finally:
+        board.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import random
+import struct
+from multiprocessing import shared_memory
+
+from bigboard import MineLayer, lanes, neighbor_counts
+from minesweeper import Minesweeper
+
+# Block header: magic, height, width, number of mines
+MAGIC = b"MSWSHM1\0"
+HEADER = struct.Struct("<8sIIQ")
+HEADER_SIZE = 64
+
+
+class SharedMinesweeper(Minesweeper):
+    """
+    Minesweeper game whose board lives in a shared memory block: a
+    bit-packed mine layer, one byte of neighbour count per cell and
+    one byte of revealed mask per cell. Any process can attach to
+    the block by name and read it without copying, and pickling the
+    game sends only the name.
+    Flags and whether a mine has been hit stay local to each process;
+    cells revealed by any process are marked in the shared mask.
+    """
+
+    def __init__(self, name):
+        self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.buf = self.shm.buf
+
+        magic, height, width, mines = HEADER.unpack_from(self.buf)
+        if magic != MAGIC:
+            self.buf = None
+            self.shm.close()
+            raise ValueError(f"{name} is not a shared Minesweeper board")
+
+        # Set width, height, and number of mines from the header
+        self.height = height
+        self.width = width
+        self.mine_count = mines
+        self.mines = MineLayer(self)
+
+        # Views of the count grid and revealed mask, one byte per cell
+        self.mine_stride = (width + 7) // 8
+        count_base = HEADER_SIZE + height * self.mine_stride
+        mask_base = count_base + height * width
+        self.counts = self.buf[count_base:mask_base]
+        self.mask = self.buf[mask_base:mask_base + height * width]
+
+        # At first, player has found no mines
+        self.reset()
+
+    @classmethod
+    def create(cls, height=8, width=8, mines=8, seed=None, layout=None):
+        """
+        Places mines just as Minesweeper does for the same arguments,
+        and writes the board to a new shared memory block. The caller
+        owns the block, and should unlink() it when done.
+        """
+        cells = set()
+        if layout is not None:
+            cells.update(layout)
+        else:
+            rng = random if seed is None else random.Random(seed)
+            while len(cells) != mines:
+                cells.add((rng.randrange(height), rng.randrange(width)))
+
+        rows = [0] * height
+        for i, j in cells:
+            rows[i] |= 1 << j
+
+        mine_stride = (width + 7) // 8
+        count_base = HEADER_SIZE + height * mine_stride
+        shm = shared_memory.SharedMemory(
+            create=True, size=count_base + 2 * height * width or 1
+        )
+        buf = shm.buf
+        HEADER.pack_into(buf, 0, MAGIC, height, width, len(cells))
+        previous = 0
+        current = lanes(rows[0], width) if height else 0
+        for i in range(height):
+            offset = HEADER_SIZE + i * mine_stride
+            buf[offset:offset + mine_stride] = rows[i].to_bytes(
+                mine_stride, "little"
+            )
+            following = lanes(rows[i + 1], width) if i + 1 < height else 0
+            offset = count_base + i * width
+            buf[offset:offset + width] = neighbor_counts(
+                previous, current, following, width
+            )
+            previous, current = current, following
+        del buf
+
+        board = cls(shm.name)
+        shm.close()
+        return board
+
+    def __reduce__(self):
+        return (SharedMinesweeper, (self.name,))
+
+    def print(self):
+        """
+        Prints a text-based representation
+        of where mines are located.
+        """
+        lines = []
+        for i in range(self.height):
+            lines.append("--" * self.width + "-")
+            lines.append("".join(
+                "|X" if self.is_mine((i, j)) else "| "
+                for j in range(self.width)
+            ) + "|")
+        lines.append("--" * self.width + "-")
+        print("\n".join(lines))
+
+    def is_mine(self, cell):
+        i, j = cell
+        byte = self.buf[HEADER_SIZE + i * self.mine_stride + j // 8]
+        return bool(byte >> (j % 8) & 1)
+
+    def nearby_mines(self, cell):
+        """
+        Returns the number of mines that are
+        within one row and column of a given cell,
+        not including the cell itself.
+        """
+        return self.counts[cell[0] * self.width + cell[1]]
+
+    def reveal(self, cell):
+        """
+        Reveals a cell as Minesweeper.reveal does, and marks it
+        in the shared revealed mask.
+        """
+        count = super().reveal(cell)
+        if count is not None:
+            self.mask[cell[0] * self.width + cell[1]] = 1
+        return count
+
+    def is_revealed(self, cell):
+        """
+        Checks if any process has revealed a cell.
+        """
+        return bool(self.mask[cell[0] * self.width + cell[1]])
+
+    def revealed_count(self):
+        """
+        Returns the number of cells revealed by every process.
+        """
+        return bytes(self.mask).count(1)
+
+    def won(self):
+        """
+        Checks if all mines, and nothing else, have been flagged,
+        or if every safe cell has been revealed by some process.
+        """
+        if self.lost:
+            return False
+        if len(self.mines_found) == self.mine_count and not self.wrong_flags:
+            return True
+        return self.revealed_count() == (
+            self.height * self.width - self.mine_count
+        )
+
+    def close(self):
+        """
+        Detaches from the shared memory block.
+        """
+        if self.buf is None:
+            return
+        self.counts.release()
+        self.mask.release()
+        self.buf = None
+        self.shm.close()
+
+    def unlink(self):
+        """
+        Detaches from the shared memory block and frees it.
+        Only the process that created the board should call this.
+        """
+        self.close()
+        self.shm.unlink()
@@ -0,0 +1,341 @@
+import collections
+import functools
+import math
+
+# Components with more cells than this are not enumerated exactly
+MAX_COMPONENT_CELLS = 30
+
+# Components with more cells than this are worth sending to a process
+# pool; smaller ones are solved faster than they can be shipped
+POOL_CELLS = 16
+
+# Components up to this size are still enumerated exactly on a process
+# pool, where they no longer hold up the caller
+POOL_MAX_CELLS = 48
+
+# Mine probability assumed for cells no sentence says anything about
+DEFAULT_DENSITY = 0.16
+
+
+class ComponentSolution():
+    """
+    Every consistent mine assignment of one frontier component,
+    summarised as the number of solutions for each total number
+    of mines in the component.
+    """
+
+    def __init__(self, cells, totals, mine_counts):
+
+        # Cells of the component, in enumeration order
+        self.cells = cells
+
+        # Number of solutions using exactly k mines, keyed by k
+        self.totals = totals
+
+        # For each cell, number of solutions with k mines where
+        # that cell is a mine, keyed by k
+        self.mine_counts = mine_counts
+
+    def solutions(self):
+        """
+        Returns the number of consistent assignments.
+        """
+        return sum(self.totals.values())
+
+    def forced(self):
+        """
+        Returns the sets of cells that are safe, and that are mines,
+        in every consistent assignment.
+        """
+        safes = set()
+        mines = set()
+        total = self.solutions()
+        if total == 0:
+            return safes, mines
+        for cell in self.cells:
+            count = sum(self.mine_counts[cell].values())
+            if count == 0:
+                safes.add(cell)
+            elif count == total:
+                mines.add(cell)
+        return safes, mines
+
+    def probabilities(self, weights=None):
+        """
+        Returns the probability of each cell being a mine, counting
+        every solution with k mines with weight weights[k]
+        (1 for every k if no weights are given).
+        """
+        if weights is None:
+            weights = dict.fromkeys(self.totals, 1)
+        total = sum(n * weights.get(k, 0) for k, n in self.totals.items())
+        if total == 0:
+            return {}
+        return {
+            cell: sum(n * weights.get(k, 0)
+                      for k, n in self.mine_counts[cell].items()) / total
+            for cell in self.cells
+        }
+
+
+def constraints(knowledge, mines, safes):
+    """
+    Returns the knowledge base as a list of (cells, count) pairs,
+    with known mines and safes taken out of every sentence and
+    empty or duplicate sentences dropped.
+    """
+    seen = set()
+    result = []
+    for sentence in knowledge:
+        cells = set()
+        count = sentence.count
+        for cell in sentence.cells:
+            if cell in mines:
+                count -= 1
+            elif cell not in safes:
+                cells.add(cell)
+        if not cells:
+            continue
+        constraint = (frozenset(cells), count)
+        if constraint not in seen:
+            seen.add(constraint)
+            result.append(constraint)
+    return result
+
+
+def components(constraint_list):
+    """
+    Splits constraints into independent groups that share no cells.
+    """
+    parent = {}
+
+    def find(cell):
+        while parent[cell] != cell:
+            parent[cell] = parent[parent[cell]]
+            cell = parent[cell]
+        return cell
+
+    for cells, _ in constraint_list:
+        first = None
+        for cell in cells:
+            parent.setdefault(cell, cell)
+            if first is None:
+                first = find(cell)
+            else:
+                root = find(cell)
+                if root != first:
+                    parent[root] = first
+
+    groups = collections.defaultdict(list)
+    for constraint in constraint_list:
+        groups[find(next(iter(constraint[0])))].append(constraint)
+    return list(groups.values())
+
+
+def solve_component(constraint_list, limit=MAX_COMPONENT_CELLS):
+    """
+    Enumerates every mine assignment of a component that satisfies
+    all of its constraints. Returns a ComponentSolution, or None if
+    the component has more than `limit` cells.
+    """
+
+    # Order cells so that neighbouring constraints close early
+    cells = []
+    index = {}
+    for cell_set, _ in constraint_list:
+        for cell in sorted(cell_set):
+            if cell not in index:
+                index[cell] = len(cells)
+                cells.append(cell)
+    if len(cells) > limit:
+        return None
+
+    watch = [[] for _ in cells]
+    remaining = []
+    unassigned = []
+    for n, (cell_set, count) in enumerate(constraint_list):
+        for cell in cell_set:
+            watch[index[cell]].append(n)
+        remaining.append(count)
+        unassigned.append(len(cell_set))
+
+    totals = collections.Counter()
+    hits = [collections.Counter() for _ in cells]
+    assignment = [0] * len(cells)
+
+    def search(position, mines):
+        if position == len(cells):
+            totals[mines] += 1
+            for n, value in enumerate(assignment):
+                if value:
+                    hits[n][mines] += 1
+            return
+        for value in (0, 1):
+            consistent = True
+            for n in watch[position]:
+                remaining[n] -= value
+                unassigned[n] -= 1
+                if remaining[n] < 0 or remaining[n] > unassigned[n]:
+                    consistent = False
+            if consistent:
+                assignment[position] = value
+                search(position + 1, mines + value)
+            for n in watch[position]:
+                remaining[n] += value
+                unassigned[n] += 1
+        assignment[position] = 0
+
+    search(0, 0)
+    return ComponentSolution(
+        tuple(cells),
+        dict(totals),
+        {cell: dict(hits[n]) for n, cell in enumerate(cells)}
+    )
+
+
+def solve(constraint_list, cache=None):
+    """
+    Solves one component, through `cache` if one is given.
+    """
+    if cache is None:
+        return solve_component(constraint_list)
+    return cache.solve(constraint_list)
+
+
+def solve_all(groups, cache=None, pool=None, pool_cells=POOL_CELLS):
+    """
+    Solves every component, returning the solutions in order.
+    With a process pool, components of more than `pool_cells` cells
+    that `cache` has not seen are solved on it concurrently, up to
+    POOL_MAX_CELLS cells rather than MAX_COMPONENT_CELLS, while the
+    rest are solved in this process.
+    """
+    solutions = [None] * len(groups)
+    futures = {}
+    for n, group in enumerate(groups):
+        size = len(frozenset().union(*(cells for cells, _ in group)))
+        if pool is None or size <= pool_cells or size > POOL_MAX_CELLS:
+            solutions[n] = solve(group, cache)
+            continue
+        if cache is not None:
+            solutions[n] = cache.get(group)
+            if solutions[n] is not None:
+                continue
+        futures[n] = pool.submit(solve_component, group, POOL_MAX_CELLS)
+
+    for n, future in futures.items():
+        solutions[n] = future.result()
+        if cache is not None:
+            cache.add(groups[n], solutions[n])
+    return solutions
+
+
+def estimate(constraint_list):
+    """
+    Cheap mine probabilities for components too large to enumerate:
+    each cell takes the highest count / size ratio of its constraints.
+    """
+    probabilities = {}
+    for cells, count in constraint_list:
+        ratio = min(max(count / len(cells), 0), 1)
+        for cell in cells:
+            probabilities[cell] = max(probabilities.get(cell, 0), ratio)
+    return probabilities
+
+
+def mine_probabilities(constraint_list, unknown, density=DEFAULT_DENSITY,
+                       cache=None, pool=None, pool_cells=POOL_CELLS):
+    """
+    Returns the probability of every unknown cell being a mine.
+    Cells in a constraint are solved per component, through `cache`
+    if one is given, with large components on `pool` if one is given;
+    cells outside every constraint are given `density`.
+    """
+    probabilities = dict.fromkeys(unknown, density)
+    groups = components(constraint_list)
+    solutions = solve_all(groups, cache, pool, pool_cells)
+    for group, solution in zip(groups, solutions):
+        if solution is None:
+            probabilities.update(estimate(group))
+        else:
+            probabilities.update(solution.probabilities())
+    return probabilities
+
+
+@functools.lru_cache(maxsize=None)
+def binomial(n, k):
+    """
+    Returns the number of ways to choose k of n cells.
+    """
+    if k < 0 or k > n:
+        return 0
+    return math.comb(n, k)
+
+
+def convolve(a, b):
+    """
+    Combines two {mines: solutions} counts of independent groups.
+    """
+    result = collections.Counter()
+    for k1, n1 in a.items():
+        for k2, n2 in b.items():
+            result[k1 + k2] += n1 * n2
+    return result
+
+
+def endgame_probabilities(constraint_list, unknown, mines_left, cache=None,
+                          pool=None, pool_cells=POOL_CELLS):
+    """
+    Returns the exact probability of every unknown cell being a mine,
+    given that exactly `mines_left` of them are. Each arrangement of
+    the frontier is weighted by the number of ways to place the rest
+    of the mines among the unconstrained cells. Returns None if a
+    component is too large to solve or nothing is consistent.
+    """
+    solutions = solve_all(
+        components(constraint_list), cache, pool, pool_cells
+    )
+    if None in solutions:
+        return None
+
+    frontier = set()
+    for solution in solutions:
+        frontier.update(solution.cells)
+    interior = [cell for cell in unknown if cell not in frontier]
+
+    combined = {0: 1}
+    for solution in solutions:
+        combined = convolve(combined, solution.totals)
+    weight = sum(
+        n * binomial(len(interior), mines_left - k)
+        for k, n in combined.items()
+    )
+    if weight == 0:
+        return None
+
+    probabilities = {}
+    if interior:
+        expected = sum(
+            n * binomial(len(interior), mines_left - k) * (mines_left - k)
+            for k, n in combined.items()
+        )
+        probabilities.update(
+            dict.fromkeys(interior, expected / (weight * len(interior)))
+        )
+
+    # Weight each component's solutions by the ways the other
+    # components and the interior can hold the remaining mines
+    for n, solution in enumerate(solutions):
+        others = {0: 1}
+        for m, other in enumerate(solutions):
+            if m != n:
+                others = convolve(others, other.totals)
+        weights = {
+            k: sum(
+                count * binomial(len(interior), mines_left - k - j)
+                for j, count in others.items()
+            )
+            for k in solution.totals
+        }
+        probabilities.update(solution.probabilities(weights))
+    return probabilities
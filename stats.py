@@ -0,0 +1,417 @@
+import argparse
+import collections
+import concurrent.futures
+import csv
+import json
+import math
+import os
+import random
+import time
+
+from minesweeper import Minesweeper
+from tournament import load_strategy, play_game
+
+# Fields of each per-game record
+FIELDS = ["seed", "won", "moves", "seconds"]
+
+
+class WinRate():
+    """
+    Running count of games and wins, with a Wilson score interval.
+    """
+
+    def __init__(self, games=0, wins=0):
+        self.games = games
+        self.wins = wins
+
+    def add(self, won):
+        self.games += 1
+        self.wins += bool(won)
+
+    def merge(self, other):
+        self.games += other.games
+        self.wins += other.wins
+
+    def rate(self):
+        return self.wins / self.games if self.games else 0.0
+
+    def interval(self, z=1.96):
+        """
+        Returns the (low, high) Wilson score interval of the win rate,
+        at 95% confidence by default.
+        """
+        if not self.games:
+            return (0.0, 1.0)
+        n = self.games
+        p = self.wins / n
+        centre = p + z * z / (2 * n)
+        spread = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n))
+        scale = 1 + z * z / n
+        return ((centre - spread) / scale, (centre + spread) / scale)
+
+    def to_dict(self):
+        return {"games": self.games, "wins": self.wins}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["games"], data["wins"])
+
+
+class Welford():
+    """
+    Running count, mean and variance, updated one value at a time
+    with Welford's method and merged with Chan's.
+    """
+
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other):
+        if not other.count:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def stdev(self):
+        return math.sqrt(self.variance())
+
+    def to_dict(self):
+        return {"count": self.count, "mean": self.mean, "m2": self.m2}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["count"], data["mean"], data["m2"])
+
+
+class QuantileSketch():
+    """
+    Mergeable quantile sketch with relative accuracy `alpha`, in the
+    style of DDSketch: positive values are counted in logarithmic
+    buckets, so any quantile is within a factor of 1 +/- alpha of the
+    true value. Past `max_buckets`, the lowest buckets are folded
+    together, losing accuracy only at the bottom.
+    """
+
+    def __init__(self, alpha=0.01, max_buckets=2048):
+        self.alpha = alpha
+        self.max_buckets = max_buckets
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = collections.Counter()
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, value):
+        self.count += 1
+        if value <= 0:
+            self.zeros += 1
+            return
+        self.buckets[math.ceil(math.log(value) / self.log_gamma)] += 1
+        if len(self.buckets) > self.max_buckets:
+            self.collapse()
+
+    def merge(self, other):
+        if other.alpha != self.alpha:
+            raise ValueError("cannot merge sketches of different accuracy")
+        self.buckets.update(other.buckets)
+        self.zeros += other.zeros
+        self.count += other.count
+        if len(self.buckets) > self.max_buckets:
+            self.collapse()
+
+    def collapse(self):
+        """
+        Folds the lowest buckets into one until few enough are left.
+        """
+        keys = sorted(self.buckets)
+        excess = len(keys) - self.max_buckets
+        target = keys[excess]
+        for key in keys[:excess]:
+            self.buckets[target] += self.buckets.pop(key)
+
+    def quantile(self, q):
+        """
+        Returns the estimated value at quantile q, from 0 to 1.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+    def to_dict(self):
+        return {
+            "alpha": self.alpha,
+            "max_buckets": self.max_buckets,
+            "buckets": sorted(self.buckets.items()),
+            "zeros": self.zeros,
+            "count": self.count,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["alpha"], data["max_buckets"])
+        sketch.buckets.update({k: n for k, n in data["buckets"]})
+        sketch.zeros = data["zeros"]
+        sketch.count = data["count"]
+        return sketch
+
+
+class RunStats():
+    """
+    Online aggregate of a simulation run: win rate, moves per game,
+    seconds per game, and per-move latency.
+    """
+
+    def __init__(self):
+        self.wins = WinRate()
+        self.moves = Welford()
+        self.seconds = Welford()
+        self.latency = Welford()
+        self.latency_sketch = QuantileSketch()
+
+    def add(self, record, latencies):
+        """
+        Adds one game's record and its move latencies.
+        """
+        self.wins.add(record["won"])
+        self.moves.add(record["moves"])
+        self.seconds.add(record["seconds"])
+        for latency in latencies:
+            self.latency.add(latency)
+            self.latency_sketch.add(latency)
+
+    def merge(self, other):
+        self.wins.merge(other.wins)
+        self.moves.merge(other.moves)
+        self.seconds.merge(other.seconds)
+        self.latency.merge(other.latency)
+        self.latency_sketch.merge(other.latency_sketch)
+
+    def to_dict(self):
+        return {
+            "wins": self.wins.to_dict(),
+            "moves": self.moves.to_dict(),
+            "seconds": self.seconds.to_dict(),
+            "latency": self.latency.to_dict(),
+            "latency_sketch": self.latency_sketch.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.wins = WinRate.from_dict(data["wins"])
+        stats.moves = Welford.from_dict(data["moves"])
+        stats.seconds = Welford.from_dict(data["seconds"])
+        stats.latency = Welford.from_dict(data["latency"])
+        stats.latency_sketch = QuantileSketch.from_dict(
+            data["latency_sketch"]
+        )
+        return stats
+
+    def report(self):
+        """
+        Returns the summary of the run so far.
+        """
+        low, high = self.wins.interval()
+        return {
+            "games": self.wins.games,
+            "win_rate": self.wins.rate(),
+            "win_rate_low": low,
+            "win_rate_high": high,
+            "moves_mean": self.moves.mean,
+            "moves_stdev": self.moves.stdev(),
+            "latency_mean_ms": self.latency.mean * 1000,
+            "latency_p50_ms": self.latency_sketch.quantile(0.5) * 1000,
+            "latency_p90_ms": self.latency_sketch.quantile(0.9) * 1000,
+            "latency_p99_ms": self.latency_sketch.quantile(0.99) * 1000,
+        }
+
+
+def simulate(spec, seeds, height, width, mines):
+    """
+    Plays one game per seed. Returns the per-game records and the
+    RunStats of these games alone, so workers send back a summary
+    instead of every latency.
+    """
+    strategy = load_strategy(spec)
+    records = []
+    stats = RunStats()
+    for seed in seeds:
+        random.seed(seed)
+        game = Minesweeper(height=height, width=width, mines=mines, seed=seed)
+        player = strategy(height=height, width=width)
+        latencies = []
+        start = time.perf_counter()
+        won = play_game(player, game, latencies)
+        record = {
+            "seed": seed,
+            "won": won,
+            "moves": len(latencies),
+            "seconds": time.perf_counter() - start,
+        }
+        records.append(record)
+        stats.add(record, latencies)
+    return records, stats
+
+
+class RecordWriter():
+    """
+    Appends per-game records to a JSON Lines file, or to a CSV file
+    if the path ends in .csv.
+    """
+
+    def __init__(self, path, fresh):
+        self.csv = path.endswith(".csv")
+        self.f = open(path, "w" if fresh else "a", newline="")
+        if self.csv:
+            self.writer = csv.DictWriter(self.f, fieldnames=FIELDS)
+            if fresh:
+                self.writer.writeheader()
+
+    def write(self, record):
+        if self.csv:
+            self.writer.writerow(record)
+        else:
+            self.f.write(json.dumps(record) + "\n")
+
+    def flush(self):
+        """
+        Flushes the file to disk, returning its size.
+        """
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        return os.fstat(self.f.fileno()).st_size
+
+    def close(self):
+        self.f.close()
+
+
+def run(spec, games, height, width, mines, output, checkpoint=None,
+        seed=0, workers=None, chunk=100):
+    """
+    Plays `games` seeded games across a process pool, streaming each
+    game's record to `output` and merging the workers' statistics.
+    After every chunk, the statistics and the output size are saved
+    to `checkpoint`, so an interrupted run with the same settings
+    picks up where it stopped. Returns the run's RunStats.
+    """
+    config = {"spec": spec, "games": games, "height": height,
+              "width": width, "mines": mines, "seed": seed}
+    stats = RunStats()
+    done = 0
+    fresh = True
+    if checkpoint is not None and os.path.exists(checkpoint):
+        with open(checkpoint) as f:
+            saved = json.load(f)
+        if saved["config"] == config and os.path.exists(output):
+            stats = RunStats.from_dict(saved["stats"])
+            done = saved["done"]
+            fresh = False
+
+            # Drop records written after the checkpoint
+            with open(output, "r+b") as f:
+                f.truncate(saved["offset"])
+
+    writer = RecordWriter(output, fresh)
+    seeds = range(seed + done, seed + games)
+    try:
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            window = 2 * (workers or os.cpu_count() or 1)
+            pending = collections.deque()
+            for n in range(0, len(seeds), chunk):
+                pending.append(pool.submit(
+                    simulate, spec, seeds[n:n + chunk], height, width, mines
+                ))
+                if len(pending) < window:
+                    continue
+
+                # Take results in order so the checkpoint stays exact
+                done = merge(pending.popleft(), writer, stats, done,
+                             checkpoint, config)
+            while pending:
+                done = merge(pending.popleft(), writer, stats, done,
+                             checkpoint, config)
+    finally:
+        writer.close()
+    return stats
+
+
+def merge(future, writer, stats, done, checkpoint, config):
+    """
+    Writes one finished chunk's records, merges its statistics, and
+    saves a checkpoint. Returns the number of games done.
+    """
+    records, part = future.result()
+    for record in records:
+        writer.write(record)
+    offset = writer.flush()
+    stats.merge(part)
+    done += len(records)
+    if checkpoint is not None:
+        temporary = checkpoint + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump({"config": config, "done": done, "offset": offset,
+                       "stats": stats.to_dict()}, f)
+        os.replace(temporary, checkpoint)
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run a large simulation, streaming per-game results."
+    )
+    parser.add_argument("output", help="records file, .jsonl or .csv")
+    parser.add_argument("--strategy", default="ai",
+                        help="strategy name or module:Class")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--height", type=int, default=8)
+    parser.add_argument("--width", type=int, default=8)
+    parser.add_argument("--mines", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk", type=int, default=100)
+    parser.add_argument("--checkpoint",
+                        help="resume from, and save progress to, this file")
+    args = parser.parse_args()
+
+    stats = run(
+        args.strategy, args.games, args.height, args.width, args.mines,
+        args.output, checkpoint=args.checkpoint, seed=args.seed,
+        workers=args.workers, chunk=args.chunk
+    )
+    report = stats.report()
+    print(f"Games: {report['games']}")
+    print(f"Win rate: {report['win_rate']:.1%} "
+          f"(95% CI {report['win_rate_low']:.1%}-"
+          f"{report['win_rate_high']:.1%})")
+    print(f"Moves: {report['moves_mean']:.1f} "
+          f"+/- {report['moves_stdev']:.1f}")
+    print(f"Move latency: mean {report['latency_mean_ms']:.3f} ms, "
+          f"p50 {report['latency_p50_ms']:.3f} ms, "
+          f"p90 {report['latency_p90_ms']:.3f} ms, "
+          f"p99 {report['latency_p99_ms']:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import io
+import random
+
+import pytest
+
+import fuzz
+from minesweeper import Minesweeper, MinesweeperAI
+
+# Seeded boards per engine, and per round trip check
+BOARDS = 30
+
+
+def boards(seed):
+    """
+    Yields (game, moves) for BOARDS seeded random boards, revealing
+    every safe cell in a random order.
+    """
+    rng = random.Random(seed)
+    for _ in range(BOARDS):
+        height, width, mines = fuzz.random_board(rng, 8)
+        game = Minesweeper(height=height, width=width, mines=mines,
+                           seed=rng.getrandbits(32))
+        yield game, fuzz.play(rng, game)
+
+
+def state(ai):
+    """
+    Returns everything an AI knows, in a form that compares equal
+    between AIs that know the same things.
+    """
+    return (
+        sorted(ai.moves_made),
+        sorted(ai.safes),
+        sorted(ai.mines),
+        sorted((sorted(s.cells), s.count) for s in ai.knowledge if s.cells),
+        ai.clock,
+    )
+
+
+@pytest.mark.parametrize(
+    "name", [name for name in fuzz.ENGINES if name != "reference"]
+)
+def test_engine(name):
+    assert fuzz.fuzz([name], BOARDS, seed=1) == []
+
+
+@pytest.mark.parametrize("backend", ["sentences", "sat"])
+def test_rollback(backend):
+    for game, moves in boards(2):
+        ai = MinesweeperAI(height=game.height, width=game.width,
+                           total_mines=len(game.mines), backend=backend)
+        for n, cell in enumerate(moves):
+            before = state(ai)
+
+            # Two nested checkpoints over the next few moves
+            ai.checkpoint()
+            for ahead in moves[n:n + 2]:
+                ai.add_knowledge(ahead, game.nearby_mines(ahead))
+            ai.checkpoint()
+            for ahead in moves[n + 2:n + 4]:
+                ai.add_knowledge(ahead, game.nearby_mines(ahead))
+            ai.rollback()
+            ai.rollback()
+            assert state(ai) == before
+            assert not ai.trail
+
+            ai.add_knowledge(cell, game.nearby_mines(cell))
+
+
+def test_commit():
+    for game, moves in boards(3):
+        ai = MinesweeperAI(height=game.height, width=game.width,
+                           backend="sat")
+        twin = MinesweeperAI(height=game.height, width=game.width,
+                             backend="sat")
+        for cell in moves:
+            ai.checkpoint()
+            ai.add_knowledge(cell, game.nearby_mines(cell))
+            ai.commit()
+            twin.add_knowledge(cell, game.nearby_mines(cell))
+            assert state(ai) == state(twin)
+
+
+@pytest.mark.parametrize("backend", ["sentences", "sat"])
+def test_save_load(backend):
+    for game, moves in boards(4):
+        ai = MinesweeperAI(height=game.height, width=game.width,
+                           total_mines=len(game.mines), backend=backend)
+        half = len(moves) // 2
+        for cell in moves[:half]:
+            ai.add_knowledge(cell, game.nearby_mines(cell))
+        f = io.BytesIO()
+        ai.save(f)
+        f.seek(0)
+        loaded = MinesweeperAI.load(f)
+        assert state(loaded) == state(ai)
+
+        # Both go on to know the same things
+        for cell in moves[half:]:
+            ai.add_knowledge(cell, game.nearby_mines(cell))
+            loaded.add_knowledge(cell, game.nearby_mines(cell))
+            assert state(loaded) == state(ai)
+
+
+def test_save_inside_checkpoint():
+    ai = MinesweeperAI(height=3, width=3)
+    ai.checkpoint()
+    with pytest.raises(ValueError):
+        ai.save(io.BytesIO())
@@ -0,0 +1,159 @@
+import functools
+from array import array
+
+# Boards with more cells than this are not tabulated; building the
+# tables costs more than it saves on boards that big
+MAX_CELLS = 1 << 16
+
+
+class Topology():
+    """
+    Neighbour tables for every cell of a board, in compressed sparse
+    row form: the neighbours of the cell with ID i * width + j are
+    the IDs indices[indptr[ID]:indptr[ID + 1]].
+    With wrap, the board is a torus and has no edges.
+    """
+
+    def __init__(self, height, width, wrap=False):
+        self.height = height
+        self.width = width
+        self.wrap = wrap
+
+        # Cell of every ID
+        self.cells = [(i, j) for i in range(height) for j in range(width)]
+
+        # Rows and columns next to each row and column, including its
+        # own; small tori can reach a cell more than once
+        def near(k, size):
+            if wrap:
+                return list(dict.fromkeys(
+                    (k + d) % size for d in (-1, 0, 1)
+                ))
+            return [k + d for d in (-1, 0, 1) if 0 <= k + d < size]
+
+        columns = [near(j, width) for j in range(width)]
+        self.indptr = array("l", [0])
+        self.indices = array("l")
+        for i in range(height):
+            bases = [r * width for r in near(i, height)]
+            for j in range(width):
+                own = i * width + j
+                self.indices.extend([
+                    base + c for base in bases for c in columns[j]
+                    if base + c != own
+                ])
+                self.indptr.append(len(self.indices))
+
+    def id(self, cell):
+        """
+        Returns the ID of a cell.
+        """
+        return cell[0] * self.width + cell[1]
+
+    def neighbor_ids(self, n):
+        """
+        Returns the IDs of the cells next to the cell with ID `n`.
+        """
+        return self.indices[self.indptr[n]:self.indptr[n + 1]]
+
+    def neighbors(self, cell):
+        """
+        Returns the cells next to `cell`.
+        """
+        cells = self.cells
+        return [cells[n] for n in self.neighbor_ids(self.id(cell))]
+
+
+@functools.lru_cache(maxsize=4)
+def build(height, width, wrap=False):
+    """
+    Returns the Topology for a board size, building it only once.
+    """
+    return Topology(height, width, wrap)
+
+
+def topology(height, width, wrap=False):
+    """
+    Returns the shared Topology for a board size, or None if the
+    board has no edges or is too large to tabulate.
+    """
+    if height is None or height * width > MAX_CELLS:
+        return None
+    return build(height, width, wrap)
+
+
+class CellIndex():
+    """
+    Numbers the cells of a board with flat integer IDs: i * width + j
+    on boards with neighbour tables, and in order of first use on
+    boards without them.
+    """
+
+    def __init__(self, height, width, wrap=False):
+        self.height = height
+        self.width = width
+        self.wrap = wrap
+        self.topology = topology(height, width, wrap)
+
+        # Cell of every ID, and the ID of every numbered cell on
+        # boards without tables
+        if self.topology is not None:
+            self.cells = self.topology.cells
+            self.ids = None
+        else:
+            self.cells = []
+            self.ids = {}
+
+    def id(self, cell):
+        """
+        Returns the ID of a cell, numbering it if it has none yet.
+        """
+        if self.ids is None:
+            return cell[0] * self.width + cell[1]
+        n = self.ids.get(cell)
+        if n is None:
+            n = self.ids[cell] = len(self.cells)
+            self.cells.append(cell)
+        return n
+
+    def find(self, cell):
+        """
+        Returns the ID of a cell, or None if it is off the board
+        or has not been numbered.
+        """
+        if self.ids is None:
+            i, j = cell
+            if 0 <= i < self.height and 0 <= j < self.width:
+                return i * self.width + j
+            return None
+        return self.ids.get(cell)
+
+    def neighbors(self, cell):
+        """
+        Returns the cells next to `cell` that are on the board.
+        A board with no height or width has no edges.
+        """
+        if self.topology is not None:
+            return self.topology.neighbors(cell)
+        cells = []
+        for i in range(cell[0] - 1, cell[0] + 2):
+            for j in range(cell[1] - 1, cell[1] + 2):
+                if (i, j) == cell:
+                    continue
+                if self.height is None:
+                    cells.append((i, j))
+                elif self.wrap:
+                    neighbor = (i % self.height, j % self.width)
+                    if neighbor != cell and neighbor not in cells:
+                        cells.append(neighbor)
+                elif 0 <= i < self.height and 0 <= j < self.width:
+                    cells.append((i, j))
+        return cells
+
+    def neighbor_ids(self, n):
+        """
+        Returns the IDs of the cells next to the cell with ID `n`.
+        """
+        if self.topology is not None:
+            return self.topology.neighbor_ids(n)
+        return [self.id(cell) for cell in self.neighbors(self.cells[n])]
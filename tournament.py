@@ -0,0 +1,195 @@
+import argparse
+import concurrent.futures
+import importlib
+import json
+import random
+import statistics
+import time
+import tracemalloc
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+
+class FirstAvailablePlayer():
+    """
+    The original fallback policy: no inference at all, a random
+    first move, then the first cell that has not been chosen.
+    """
+
+    def __init__(self, height=8, width=8):
+        self.height = height
+        self.width = width
+        self.moves_made = set()
+
+    def add_knowledge(self, cell, count):
+        """
+        Records the move; the count is ignored.
+        """
+        self.moves_made.add(cell)
+
+    def make_safe_move(self):
+        """
+        Never knows of a safe move.
+        """
+        return None
+
+    def make_random_move(self):
+        """
+        Returns a random cell on the first move, and the first cell
+        not yet chosen after that.
+        """
+        if not self.moves_made:
+            return (random.randrange(self.height), random.randrange(self.width))
+        for i in range(self.height):
+            for j in range(self.width):
+                if (i, j) not in self.moves_made:
+                    return (i, j)
+        return None
+
+
+# Strategies available by name; anything else is "module:Class"
+STRATEGIES = {
+    "ai": MinesweeperAI,
+    "first": FirstAvailablePlayer,
+}
+
+
+def load_strategy(spec):
+    """
+    Returns the player class for a strategy name or "module:Class".
+    """
+    if spec in STRATEGIES:
+        return STRATEGIES[spec]
+    module, _, name = spec.partition(":")
+    if not name:
+        raise ValueError(f"unknown strategy {spec!r}, expected module:Class")
+    return getattr(importlib.import_module(module), name)
+
+
+def play_game(player, game, latencies=None):
+    """
+    Plays one game to the end with `player`.
+    Appends the time taken by each move to `latencies`, if given.
+    Returns True if every safe cell was revealed.
+    """
+    while not game.over():
+        start = time.perf_counter()
+        move = player.make_safe_move()
+        if move is None:
+            move = player.make_random_move()
+        if move is None or move in game.revealed:
+            return False
+        count = game.reveal(move)
+        if count is None:
+            return False
+        player.add_knowledge(move, count)
+        if latencies is not None:
+            latencies.append(time.perf_counter() - start)
+    return game.won()
+
+
+def play_games(spec, seeds, height, width, mines, trace_memory):
+    """
+    Plays one game per seed with the given strategy.
+    Returns a list of (won, move latencies, peak traced bytes).
+    """
+    strategy = load_strategy(spec)
+    results = []
+    for seed in seeds:
+        random.seed(seed)
+        game = Minesweeper(height=height, width=width, mines=mines, seed=seed)
+        latencies = []
+        if trace_memory:
+            tracemalloc.start()
+        player = strategy(height=height, width=width)
+        won = play_game(player, game, latencies)
+        peak = 0
+        if trace_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        results.append((won, latencies, peak))
+    return results
+
+
+def percentile(values, fraction):
+    """
+    Returns the value at `fraction` of the way through sorted values.
+    """
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def summarise(results):
+    """
+    Reduces one strategy's game results to its report entry.
+    """
+    latencies = [t for _, game_latencies, _ in results for t in game_latencies]
+    return {
+        "games": len(results),
+        "wins": sum(won for won, _, _ in results),
+        "win_rate": sum(won for won, _, _ in results) / len(results),
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "peak_kib": max(peak for _, _, peak in results) / 1024,
+    }
+
+
+def tournament(specs, games=100, height=8, width=8, mines=8, seed=0,
+               workers=None, chunk=10, trace_memory=True):
+    """
+    Plays every strategy on the same seeded boards across a process
+    pool, and returns a report entry per strategy.
+    """
+    seeds = list(range(seed, seed + games))
+    chunks = [seeds[n:n + chunk] for n in range(0, len(seeds), chunk)]
+    results = {spec: [] for spec in specs}
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        futures = {
+            pool.submit(play_games, spec, part, height, width, mines,
+                        trace_memory): spec
+            for spec in specs
+            for part in chunks
+        }
+        for future in concurrent.futures.as_completed(futures):
+            results[futures[future]].extend(future.result())
+    return {spec: summarise(results[spec]) for spec in specs}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare Minesweeper strategies on identical boards."
+    )
+    parser.add_argument("strategies", nargs="*", default=["ai", "first"],
+                        help="strategy names or module:Class")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--height", type=int, default=8)
+    parser.add_argument("--width", type=int, default=8)
+    parser.add_argument("--mines", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip tracemalloc, which slows every move")
+    parser.add_argument("--json", help="also write the report here")
+    args = parser.parse_args()
+
+    report = tournament(
+        args.strategies, games=args.games, height=args.height,
+        width=args.width, mines=args.mines, seed=args.seed,
+        workers=args.workers, trace_memory=not args.no_memory
+    )
+
+    print(f"{'strategy':<24}{'win rate':>10}{'mean ms':>10}"
+          f"{'p99 ms':>10}{'peak KiB':>10}")
+    for spec, entry in report.items():
+        print(f"{spec:<24}{entry['win_rate']:>10.1%}{entry['mean_ms']:>10.3f}"
+              f"{entry['p99_ms']:>10.3f}{entry['peak_kib']:>10.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()